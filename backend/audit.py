@@ -0,0 +1,244 @@
+import gzip
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from database import DatabaseConnection, get_db, now_ts
+from queries import INSERT_LOOKUP_AUDIT
+
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "backend/audit_archive")
+AUDIT_RETENTION_INTERVAL_SECONDS = float(os.getenv("AUDIT_RETENTION_INTERVAL_SECONDS", "3600"))
+
+AUDIT_COLUMNS = "id, user_id, query_card_name, query_issuer, status, payload_json, created_at"
+AUDIT_COLUMN_DDL = """
+  id TEXT NOT NULL,
+  user_id TEXT NOT NULL,
+  query_card_name TEXT NOT NULL,
+  query_issuer TEXT,
+  status TEXT NOT NULL,
+  payload_json TEXT,
+  created_at TEXT NOT NULL
+"""
+LEGACY_PARTITION = "lookup_audit_legacy"
+LEGACY_BOUND_MARGIN = timedelta(minutes=15)
+
+# Partition names already known to exist in this process.
+_known_partitions: set[str] = set()
+
+
+def _month_bounds(ts: str) -> tuple[str, str, str]:
+    year, month = int(ts[:4]), int(ts[5:7])
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"lookup_audit_{year:04d}_{month:02d}", f"{year:04d}-{month:02d}", f"{next_year:04d}-{next_month:02d}"
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _register(conn: DatabaseConnection, name: str, start: str, end: str) -> None:
+    conn.execute(
+        "INSERT INTO audit_partitions (name, range_start, range_end) VALUES (?, ?, ?) ON CONFLICT(name) DO NOTHING",
+        (name, start, end),
+    )
+
+
+def _table_kind(conn: DatabaseConnection, table: str) -> str | None:
+    if conn.driver == "postgres":
+        row = conn.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(?)",
+            (table,),
+        ).fetchone()
+        return row["relkind"] if row else None
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+    return "r" if row else None
+
+
+def _pg_prepare_legacy(conn: DatabaseConnection, bound: str) -> None:
+    """Give the unpartitioned table the parent's key and a validated range CHECK without long locks.
+
+    Runs in autocommit: the indexes are built concurrently and VALIDATE only blocks DDL, so
+    writers keep going. With the CHECK in place ATTACH PARTITION does not rescan the table.
+    """
+    conn.commit()
+    conn.conn.autocommit = True
+    try:
+        conn.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {LEGACY_PARTITION}_key ON lookup_audit (id, created_at)")
+        conn.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {LEGACY_PARTITION}_user_created_idx ON lookup_audit (user_id, created_at)"
+        )
+        conn.execute(f"ALTER TABLE lookup_audit DROP CONSTRAINT IF EXISTS {LEGACY_PARTITION}_bound")
+        conn.execute(
+            f"ALTER TABLE lookup_audit ADD CONSTRAINT {LEGACY_PARTITION}_bound CHECK (created_at < {_sql_literal(bound)}) NOT VALID"
+        )
+        conn.execute(f"ALTER TABLE lookup_audit VALIDATE CONSTRAINT {LEGACY_PARTITION}_bound")
+    finally:
+        conn.conn.autocommit = False
+
+
+def _pg_attach_legacy(conn: DatabaseConnection, bound: str) -> None:
+    pkey = conn.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(?) AND contype = 'p'",
+        (LEGACY_PARTITION,),
+    ).fetchone()
+    if pkey:
+        conn.execute(f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {pkey['conname']}")
+    conn.execute(f"ALTER TABLE {LEGACY_PARTITION} ADD CONSTRAINT {LEGACY_PARTITION}_pkey PRIMARY KEY USING INDEX {LEGACY_PARTITION}_key")
+    conn.execute(
+        f"ALTER TABLE lookup_audit ATTACH PARTITION {LEGACY_PARTITION} FOR VALUES FROM (MINVALUE) TO ({_sql_literal(bound)})"
+    )
+    conn.execute(f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {LEGACY_PARTITION}_bound")
+
+
+def init_audit_storage() -> None:
+    """Move an unpartitioned lookup_audit aside as the legacy partition and prepare current periods."""
+    conn = get_db()
+    now = now_ts()
+    kind = _table_kind(conn, "lookup_audit")
+
+    if conn.driver == "postgres":
+        # Instances still on the old code keep inserting during a rolling deploy; leave them
+        # a margin below the legacy bound, but never past the end of this month.
+        bound = min((datetime.now(timezone.utc) + LEGACY_BOUND_MARGIN).isoformat(), _month_bounds(now)[2])
+        if kind == "r":
+            _pg_prepare_legacy(conn, bound)
+            conn.execute(f"ALTER TABLE lookup_audit RENAME TO {LEGACY_PARTITION}")
+        if kind != "p":
+            conn.execute(f"CREATE TABLE lookup_audit ({AUDIT_COLUMN_DDL}, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS lookup_audit_user_created_idx ON lookup_audit (user_id, created_at)")
+        if kind == "r":
+            _pg_attach_legacy(conn, bound)
+            _register(conn, LEGACY_PARTITION, "", bound)
+    elif kind == "r":
+        conn.execute(f"ALTER TABLE lookup_audit RENAME TO {LEGACY_PARTITION}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {LEGACY_PARTITION}_user_created_idx ON {LEGACY_PARTITION} (user_id, created_at)")
+        _register(conn, LEGACY_PARTITION, "", now)
+
+    ensure_partition(conn, now)
+    ensure_partition(conn, _month_bounds(now)[2] + "-01")
+    conn.commit()
+    conn.close()
+
+
+def ensure_partition(conn: DatabaseConnection, ts: str) -> str:
+    """Create the monthly partition covering ts if needed and return its name. The caller commits."""
+    name, start, end = _month_bounds(ts)
+    if name in _known_partitions:
+        return name
+
+    if conn.execute("SELECT name FROM audit_partitions WHERE name = ?", (name,)).fetchone():
+        # Only cache committed partitions; a new one may still be rolled back with the caller.
+        _known_partitions.add(name)
+    else:
+        # The first period after a migration starts where the legacy partition ends.
+        row = conn.execute("SELECT MAX(range_end) AS last_end FROM audit_partitions WHERE range_end <= ?", (end,)).fetchone()
+        if row and row["last_end"] and row["last_end"] > start:
+            start = row["last_end"]
+        if start >= end:
+            # The legacy partition already covers this whole period.
+            return name
+        if conn.driver == "postgres":
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF lookup_audit "
+                f"FOR VALUES FROM ({_sql_literal(start)}) TO ({_sql_literal(end)})"
+            )
+        else:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {name} ({AUDIT_COLUMN_DDL}, PRIMARY KEY (id))")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_user_created_idx ON {name} (user_id, created_at)")
+        _register(conn, name, start, end)
+    return name
+
+
+def record_lookup_audit(
+    conn: DatabaseConnection,
+    user_id: str,
+    card_name: str,
+    issuer: str | None,
+    status: str,
+    payload: dict[str, Any],
+) -> None:
+    created_at = now_ts()
+    params = (str(uuid.uuid4()), user_id, card_name, issuer, status, json.dumps(payload), created_at)
+    partition = ensure_partition(conn, created_at)
+    if conn.driver == "postgres":
+        conn.run(INSERT_LOOKUP_AUDIT, params)
+    else:
+        conn.execute(f"INSERT INTO {partition} ({AUDIT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", params)
+
+
+def query_audit(conn: DatabaseConnection, user_id: str, start: str, end: str, limit: int = 100) -> list[dict[str, Any]]:
+    """Audit rows for one user in [start, end), newest first, touching only overlapping partitions."""
+    if conn.driver == "postgres":
+        rows = conn.execute(
+            f"SELECT {AUDIT_COLUMNS} FROM lookup_audit WHERE user_id = ? AND created_at >= ? AND created_at < ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, start, end, limit),
+        ).fetchall()
+    else:
+        partitions = conn.execute(
+            "SELECT name FROM audit_partitions WHERE range_start < ? AND range_end > ? ORDER BY range_start DESC",
+            (end, start),
+        ).fetchall()
+        rows = []
+        for partition in partitions:
+            rows.extend(
+                conn.execute(
+                    f"SELECT {AUDIT_COLUMNS} FROM {partition['name']} WHERE user_id = ? AND created_at >= ? AND created_at < ? ORDER BY created_at DESC LIMIT ?",
+                    (user_id, start, end, limit - len(rows)),
+                ).fetchall()
+            )
+            if len(rows) >= limit:
+                break
+
+    results = []
+    for row in rows:
+        item = {k: row[k] for k in row.keys()}
+        item["payload"] = json.loads(item.pop("payload_json")) if item["payload_json"] else None
+        results.append(item)
+    return results
+
+
+def _archive_partition(conn: DatabaseConnection, name: str) -> str:
+    os.makedirs(AUDIT_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(AUDIT_ARCHIVE_DIR, f"{name}.ndjson.gz")
+    fd, tmp_path = tempfile.mkstemp(dir=AUDIT_ARCHIVE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            for row in conn.stream(f"SELECT {AUDIT_COLUMNS} FROM {name} ORDER BY created_at"):
+                out.write(json.dumps({k: row[k] for k in row.keys()}).encode("utf-8") + b"\n")
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def archive_expired_partitions(now: datetime | None = None) -> list[str]:
+    """Archive partitions entirely older than the retention window to NDJSON.gz, then drop them."""
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=AUDIT_RETENTION_DAYS)).isoformat()
+    conn = get_db()
+    archived = []
+    try:
+        ensure_partition(conn, _month_bounds(now.isoformat())[2] + "-01")
+        conn.commit()
+        expired = conn.execute(
+            "SELECT name FROM audit_partitions WHERE range_end <= ? ORDER BY range_end",
+            (cutoff,),
+        ).fetchall()
+        for row in expired:
+            name = row["name"]
+            _archive_partition(conn, name)
+            if conn.driver == "postgres":
+                conn.execute(f"ALTER TABLE lookup_audit DETACH PARTITION {name}")
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+            conn.execute("DELETE FROM audit_partitions WHERE name = ?", (name,))
+            conn.commit()
+            _known_partitions.discard(name)
+            archived.append(name)
+    finally:
+        conn.close()
+    return archived
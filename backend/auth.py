@@ -6,7 +6,11 @@ import os
 import time
 from typing import Any
 
-from fastapi import Header, HTTPException
+from fastapi import Depends, Header, HTTPException
+
+from database import get_db
+from profiling import span
+from queries import ADMIN_BY_USER_ID
 
 JWT_SECRET = os.getenv("JWT_SECRET", "change-me")
 
@@ -63,7 +67,19 @@ def verify_jwt(token: str) -> dict[str, Any] | None:
 def require_user(authorization: str | None = Header(default=None)) -> dict[str, Any]:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Unauthorized")
-    payload = verify_jwt(authorization.replace("Bearer ", "", 1))
+    with span("auth"):
+        payload = verify_jwt(authorization.replace("Bearer ", "", 1))
     if not payload:
         raise HTTPException(status_code=401, detail="Unauthorized")
     return payload
+
+
+def require_admin(user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
+    # Admin rights live in admin_users, granted by user id with scripts/grant_admin.py; the
+    # email claim only shows an address was typed at registration, not that it is owned.
+    conn = get_db()
+    row = conn.run(ADMIN_BY_USER_ID, (user["sub"],)).fetchone()
+    conn.close()
+    if not row:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return user
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from database import DatabaseConnection, get_db, mark_user_write, now_ts
+from gemini_service import CATEGORY_KEYS, extract_cards_from_web
+from resilience import CircuitOpenError
+from scheduler import claim_lease, release_lease
+from wallet_snapshot import rematerialize_card_holders
+
+logger = logging.getLogger(__name__)
+
+CARD_REFRESH_INTERVAL_SECONDS = float(os.getenv("CARD_REFRESH_INTERVAL_SECONDS", "21600"))
+CARD_REFRESH_STALE_DAYS = float(os.getenv("CARD_REFRESH_STALE_DAYS", "30"))
+CARD_REFRESH_RECHECK_HOURS = float(os.getenv("CARD_REFRESH_RECHECK_HOURS", "24"))
+CARD_REFRESH_BATCH_SIZE = int(os.getenv("CARD_REFRESH_BATCH_SIZE", "5"))
+CARD_REFRESH_PARALLELISM = int(os.getenv("CARD_REFRESH_PARALLELISM", "2"))
+CARD_REFRESH_MAX_CALLS = int(os.getenv("CARD_REFRESH_MAX_CALLS", "10"))
+# Rate differences at or below this are treated as noise from re-extraction.
+CARD_REFRESH_RATE_EPSILON = 0.0005
+
+# Held in job_leases while a run is in progress so instances do not refresh the same cards.
+CARD_REFRESH_LEASE = "card-refresh"
+CARD_REFRESH_LEASE_SECONDS = 3600.0
+
+_run_lock = threading.Lock()
+
+
+def _candidates(conn: DatabaseConnection, now: datetime, limit: int) -> list[dict[str, Any]]:
+    """Pending or stale extracted cards not checked recently, least recently checked first.
+
+    A card is stale once neither an update nor a check happened for CARD_REFRESH_STALE_DAYS;
+    unchanged results do not bump updated_at, so the last check counts too.
+    """
+    stale_before = (now - timedelta(days=CARD_REFRESH_STALE_DAYS)).isoformat()
+    recheck_before = (now - timedelta(hours=CARD_REFRESH_RECHECK_HOURS)).isoformat()
+    rows = conn.execute(
+        """
+        SELECT c.id, c.card_name, c.issuer, c.network, c.reward_rules_json
+        FROM card_catalog c
+        LEFT JOIN card_refresh_state s ON s.card_catalog_id = c.id
+        WHERE c.source <> 'manual_verified'
+          AND (c.verification_status = 'pending' OR COALESCE(s.checked_at, c.updated_at) < ?)
+          AND (s.checked_at IS NULL OR s.checked_at < ?)
+        ORDER BY COALESCE(s.checked_at, ''), c.updated_at
+        LIMIT ?
+        """,
+        (stale_before, recheck_before, limit),
+    ).fetchall()
+    return [
+        {
+            "id": r["id"],
+            "card_name": r["card_name"],
+            "issuer": r["issuer"],
+            "network": r["network"],
+            "reward_rules": json.loads(r["reward_rules_json"]),
+        }
+        for r in rows
+    ]
+
+
+def _rules_changed(old: dict[str, Any], new: dict[str, float]) -> bool:
+    for key in CATEGORY_KEYS:
+        try:
+            before = float(old.get(key, 0.0))
+        except (TypeError, ValueError):
+            return True
+        if abs(before - new.get(key, 0.0)) > CARD_REFRESH_RATE_EPSILON:
+            return True
+    return False
+
+
+def _record_state(conn: DatabaseConnection, card_id: str, status: str, checked_at: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO card_refresh_state (card_catalog_id, checked_at, last_status) VALUES (?, ?, ?)
+        ON CONFLICT(card_catalog_id) DO UPDATE SET checked_at = excluded.checked_at, last_status = excluded.last_status
+        """,
+        (card_id, checked_at, status),
+    )
+
+
+def refresh_cards(max_calls: int | None = None, now: datetime | None = None) -> dict[str, Any]:
+    """Re-extract pending and stale cards, several per Gemini call, and store only real rate changes.
+
+    Raises RuntimeError if another refresh is already running, here or on another instance.
+    """
+    if not _run_lock.acquire(blocking=False):
+        raise RuntimeError("A card refresh is already running")
+    try:
+        if not claim_lease(CARD_REFRESH_LEASE, CARD_REFRESH_LEASE_SECONDS):
+            raise RuntimeError("A card refresh is already running on another instance")
+        try:
+            return _refresh(CARD_REFRESH_MAX_CALLS if max_calls is None else max_calls, now or datetime.now(timezone.utc))
+        finally:
+            release_lease(CARD_REFRESH_LEASE)
+    finally:
+        _run_lock.release()
+
+
+def _refresh(max_calls: int, now: datetime) -> dict[str, Any]:
+    batch_size = max(1, CARD_REFRESH_BATCH_SIZE)
+    stats: dict[str, Any] = {
+        "cards_checked": 0,
+        "cards_changed": 0,
+        "cards_failed": 0,
+        "gemini_calls": 0,
+        "cards_per_call": 0.0,
+        "stopped": None,
+    }
+    conn = get_db()
+    try:
+        cards = _candidates(conn, now, max(0, max_calls) * batch_size)
+        batches = [cards[i : i + batch_size] for i in range(0, len(cards), batch_size)]
+        changed_ids: list[str] = []
+
+        # Gemini calls run on the pool; all database work stays on this thread and connection.
+        with ThreadPoolExecutor(max_workers=max(1, CARD_REFRESH_PARALLELISM), thread_name_prefix="card-refresh") as pool:
+            pending: dict[Future, list[dict[str, Any]]] = {}
+            queue = list(batches)
+            while queue or pending:
+                while queue and len(pending) < max(1, CARD_REFRESH_PARALLELISM) and stats["stopped"] is None:
+                    batch = queue.pop(0)
+                    pending[pool.submit(extract_cards_from_web, batch)] = batch
+                    stats["gemini_calls"] += 1
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = pending.pop(future)
+                    checked_at = now_ts()
+                    try:
+                        results = future.result()
+                    except CircuitOpenError:
+                        # The breaker rejected the call before it was sent; leave these cards
+                        # unchecked so the next run retries them first.
+                        stats["gemini_calls"] -= 1
+                        stats["stopped"] = "circuit_open"
+                        queue.clear()
+                        continue
+                    except Exception:
+                        logger.exception("Card refresh batch of %d failed", len(batch))
+                        results = [None] * len(batch)
+
+                    for card, result in zip(batch, results):
+                        if result is None:
+                            stats["cards_failed"] += 1
+                            _record_state(conn, card["id"], "failed", checked_at)
+                            continue
+                        stats["cards_checked"] += 1
+                        if not _rules_changed(card["reward_rules"], result["reward_rules"]):
+                            _record_state(conn, card["id"], "unchanged", checked_at)
+                            continue
+                        conn.execute(
+                            "UPDATE card_catalog SET reward_rules_json = ?, evidence_json = ?, updated_at = ? WHERE id = ?",
+                            (json.dumps(result["reward_rules"]), json.dumps(result["evidence"]), checked_at, card["id"]),
+                        )
+                        _record_state(conn, card["id"], "changed", checked_at)
+                        changed_ids.append(card["id"])
+                        stats["cards_changed"] += 1
+                    conn.commit()
+
+        users = rematerialize_card_holders(conn, changed_ids)
+        conn.commit()
+    finally:
+        conn.close()
+
+    for user_id in users:
+        mark_user_write(user_id)
+    if stats["gemini_calls"]:
+        stats["cards_per_call"] = round(stats["cards_checked"] / stats["gemini_calls"], 2)
+    return stats
@@ -0,0 +1,206 @@
+import heapq
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+from database import get_read_db
+
+CARD_SEARCH_SYNC_SECONDS = float(os.getenv("CARD_SEARCH_SYNC_SECONDS", "30"))
+# updated_at is stamped before commit by any worker and read from a possibly lagging replica, so a
+# row can become visible after newer ones were synced; each sync re-reads this far back.
+CARD_SEARCH_SYNC_OVERLAP_SECONDS = float(os.getenv("CARD_SEARCH_SYNC_OVERLAP_SECONDS", "300"))
+LOOKUP_MIN_SCORE = float(os.getenv("CARD_SEARCH_LOOKUP_MIN_SCORE", "0.85"))
+
+STOP_WORDS = {"bank", "card", "cards", "credit", "the"}
+
+# Trigrams are scanned rarest first; common ones are skipped once this many
+# postings have been counted and some candidates exist.
+SCAN_BUDGET = 2000
+MAX_CANDIDATES = 64
+MIN_RERANK = 4
+
+
+def normalize(text: str) -> str:
+    tokens: list[str] = []
+    for token in re.split(r"[^a-z0-9]+", text.lower()):
+        if token and token not in STOP_WORDS and token not in tokens:
+            tokens.append(token)
+    return " ".join(tokens)
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distances(query: str, doc: str) -> tuple[int, int]:
+    """Levenshtein distance from query to the whole doc and to its closest prefix."""
+    previous = list(range(len(doc) + 1))
+    for i, cq in enumerate(query, 1):
+        current = [i]
+        left = i
+        for j, cd in enumerate(doc, 1):
+            best = previous[j - 1] if cq == cd else previous[j - 1] + 1
+            if previous[j] + 1 < best:
+                best = previous[j] + 1
+            if left + 1 < best:
+                best = left + 1
+            current.append(best)
+            left = best
+        previous = current
+    return previous[-1], min(previous)
+
+
+def edit_distance(query: str, doc: str) -> int:
+    """Levenshtein distance between whole strings; the shared prefix and suffix are skipped."""
+    start = 0
+    while start < len(query) and start < len(doc) and query[start] == doc[start]:
+        start += 1
+    end = 0
+    while end < len(query) - start and end < len(doc) - start and query[-1 - end] == doc[-1 - end]:
+        end += 1
+    return edit_distances(query[start : len(query) - end], doc[start : len(doc) - end])[0]
+
+
+class CardSearchIndex:
+    """Trigram inverted index over card_catalog names, re-ranked by edit distance."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._docs: dict[str, tuple[dict[str, Any], str, set[str]]] = {}
+        self._postings: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def upsert(self, card: dict[str, Any]) -> None:
+        summary = {
+            "id": card["id"],
+            "card_name": card["card_name"],
+            "issuer": card["issuer"],
+            "network": card.get("network"),
+            "verification_status": card["verification_status"],
+        }
+        text = normalize(f"{card['issuer']} {card['card_name']}")
+        grams = trigrams(text)
+        with self._lock:
+            self.remove(card["id"])
+            self._docs[card["id"]] = (summary, text, grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(card["id"])
+
+    def remove(self, card_id: str) -> None:
+        with self._lock:
+            doc = self._docs.pop(card_id, None)
+            if not doc:
+                return
+            for gram in doc[2]:
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(card_id)
+                    if not ids:
+                        del self._postings[gram]
+
+    def search(
+        self, query: str, limit: int = 10, verification: str | None = None, prefix: bool = True
+    ) -> list[tuple[float, dict[str, Any]]]:
+        """Rank cards by trigram overlap and edit similarity.
+
+        prefix=True also credits the query as a prefix of a longer name (autocomplete); lookups
+        pass False so "HDFC Regalia" does not resolve to "HDFC Regalia Gold".
+        """
+        text = normalize(query)
+        if not text:
+            return []
+        grams = trigrams(text)
+
+        with self._lock:
+            postings = sorted((self._postings.get(g, ()) for g in grams), key=len)
+            counts: Counter[str] = Counter()
+            scanned = 0
+            for ids in postings:
+                if scanned + len(ids) > SCAN_BUDGET and counts:
+                    break
+                scanned += len(ids)
+                counts.update(ids)
+
+            candidates = []
+            # A full sort in C beats most_common's Python-level heap over thousands of counted ids.
+            for card_id in sorted(counts, key=counts.__getitem__, reverse=True)[: MAX_CANDIDATES * 4]:
+                summary, doc_text, doc_grams = self._docs[card_id]
+                if verification and summary["verification_status"] != verification:
+                    continue
+                dice = 2 * len(grams & doc_grams) / (len(grams) + len(doc_grams))
+                candidates.append((dice, summary, doc_text))
+                if len(candidates) >= MAX_CANDIDATES:
+                    break
+
+        results: list[tuple[float, dict[str, Any]]] = []
+        top = heapq.nlargest(max(limit, MIN_RERANK), candidates, key=lambda c: c[0])
+        for dice, summary, doc_text in top:
+            if dice < 0.75 * top[0][0]:
+                break
+            if len(results) >= limit and 0.5 * dice + 0.5 < min(r[0] for r in results):
+                break
+            if prefix:
+                full, prefix_distance = edit_distances(text, doc_text)
+                similarity = max(1 - full / max(len(text), len(doc_text)), 0.9 * (1 - prefix_distance / len(text)))
+            else:
+                similarity = 1 - edit_distance(text, doc_text) / max(len(text), len(doc_text))
+            score = 0.5 * dice + 0.5 * similarity
+            results.append((round(score, 4), summary))
+        results.sort(key=lambda r: r[0], reverse=True)
+        return results[:limit]
+
+
+_index = CardSearchIndex()
+_sync_lock = threading.Lock()
+_synced_at = 0.0
+_synced_until = ""
+
+
+def _sync(rows: Iterable[Any]) -> None:
+    global _synced_until
+    for row in rows:
+        _index.upsert(row)
+        if row["updated_at"] > _synced_until:
+            _synced_until = row["updated_at"]
+
+
+def _sync_since() -> str:
+    if not _synced_until:
+        return ""
+    return (datetime.fromisoformat(_synced_until) - timedelta(seconds=CARD_SEARCH_SYNC_OVERLAP_SECONDS)).isoformat()
+
+
+def card_index() -> CardSearchIndex:
+    """Return the process-wide index, pulling catalog rows changed by other workers."""
+    global _synced_at
+    if time.monotonic() - _synced_at < CARD_SEARCH_SYNC_SECONDS:
+        return _index
+    with _sync_lock:
+        if time.monotonic() - _synced_at >= CARD_SEARCH_SYNC_SECONDS:
+            conn = get_read_db()
+            rows = conn.execute(
+                """
+                SELECT id, card_name, issuer, network, verification_status, updated_at
+                FROM card_catalog WHERE updated_at >= ?
+                """,
+                (_sync_since(),),
+            ).fetchall()
+            conn.close()
+            _sync({k: r[k] for k in r.keys()} for r in rows)
+            _synced_at = time.monotonic()
+    return _index
+
+
+def find_verified_match(card_name: str, issuer: str) -> tuple[str, float] | None:
+    results = card_index().search(f"{issuer} {card_name}", limit=1, verification="verified", prefix=False)
+    if results and results[0][0] >= LOOKUP_MIN_SCORE:
+        score, summary = results[0]
+        return summary["id"], score
+    return None
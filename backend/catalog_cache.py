@@ -0,0 +1,83 @@
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+
+from compression import available_encodings, compress
+from database import DatabaseConnection, get_db, row_to_card
+from queries import CATALOG_BY_STATUS, CATALOG_VERSION
+
+
+@dataclass
+class CatalogPayload:
+    version: tuple[str, int]
+    tag: str
+    bodies: dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str) -> str:
+        """Strong validator for one representation; each encoding gets its own."""
+        return f'"{self.tag}"' if encoding == "identity" else f'"{self.tag}-{encoding}"'
+
+
+_payloads: dict[str, CatalogPayload] = {}
+_build_locks = {"verified": threading.Lock(), "pending": threading.Lock()}
+
+
+def _encode(cards: list[dict]) -> bytes:
+    # Same bytes FastAPI's JSONResponse would produce for {"cards": cards}.
+    return json.dumps({"cards": cards}, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _version(conn: DatabaseConnection, verification: str) -> tuple[str, int]:
+    row = conn.run(CATALOG_VERSION, (verification,)).fetchone()
+    return row["last_updated"] or "", int(row["card_count"])
+
+
+def _build(verification: str) -> CatalogPayload:
+    conn = get_db()
+    try:
+        version = _version(conn, verification)
+        rows = conn.run(CATALOG_BY_STATUS, (verification,)).fetchall()
+    finally:
+        conn.close()
+    body = _encode([row_to_card(r) for r in rows])
+    digest = hashlib.sha1(f"{verification}:{version[0]}:{version[1]}".encode()).hexdigest()[:16]
+    payload = CatalogPayload(version, f"catalog-{digest}", {"identity": body})
+    for encoding in available_encodings():
+        payload.bodies[encoding] = compress(body, encoding, best=True)
+    return payload
+
+
+def catalog_payload(conn: DatabaseConnection, verification: str) -> CatalogPayload:
+    """Serialized and precompressed catalog for one verification status.
+
+    conn (usually a replica) only signals that the catalog may have moved on; the primary
+    confirms it before anything is rebuilt, so replicas lagging by different amounts cannot
+    make the cache flip between versions. Other requests keep getting the cached payload while
+    a rebuild runs. The version is the newest updated_at plus the row count, so catalog writers
+    must bump updated_at.
+    """
+    seen = _version(conn, verification)
+    cached = _payloads.get(verification)
+    if cached is not None and (seen == cached.version or seen[0] < cached.version[0]):
+        return cached
+
+    lock = _build_locks[verification]
+    if cached is not None and not lock.acquire(blocking=False):
+        return cached
+    if cached is None:
+        lock.acquire()
+    try:
+        cached = _payloads.get(verification)
+        if cached is not None:
+            primary = get_db()
+            try:
+                current = _version(primary, verification)
+            finally:
+                primary.close()
+            if current == cached.version:
+                return cached
+        cached = _payloads[verification] = _build(verification)
+        return cached
+    finally:
+        lock.release()
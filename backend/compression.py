@@ -0,0 +1,126 @@
+import gzip
+import os
+from typing import Any
+
+try:
+    import brotli
+except Exception:  # pragma: no cover - optional until dependency installed
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def available_encodings() -> list[str]:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Pick br or gzip from an Accept-Encoding header, honouring q-values; None means identity."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """Compress body; best=True spends maximum effort, for payloads compressed once and served many times."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if best else COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def _header(headers: list[tuple[bytes, bytes]], name: bytes) -> bytes | None:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """Compresses single-message responses of at least COMPRESS_MIN_BYTES.
+
+    Streamed responses (including the /api/chat event stream) and bodies that already carry a
+    Content-Encoding, such as the precompressed catalog, are passed through unchanged.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: dict[str, Any] | None = None
+        passthrough = False
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (
+                    _header(headers, b"content-encoding") is not None
+                    or content_type.startswith("text/event-stream")
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            assert start is not None
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"vary"]
+            vary = _header(start.get("headers", []), b"vary")
+            vary_values = {v.strip().lower() for v in vary.decode("latin-1").split(",")} if vary else set()
+            vary_values.add("accept-encoding")
+            headers.append((b"vary", ", ".join(sorted(vary_values)).encode("latin-1")))
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < COMPRESS_MIN_BYTES:
+                passthrough = True
+                await send({**start, "headers": headers})
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,19 +1,35 @@
-﻿import json
+﻿import itertools
+import json
 import os
+import queue
 import sqlite3
+import threading
+import time
+import uuid
+from contextvars import ContextVar
 from datetime import datetime, timezone
-from typing import Any, Iterable, Mapping
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Iterator, Mapping, Sequence
 
 from cards_seed import CURATED_CARDS
+from profiling import span
 
 try:
     import psycopg
-    from psycopg.rows import dict_row
 except Exception:  # pragma: no cover - optional until dependency installed
     psycopg = None
-    dict_row = None
 
 DB_PATH = os.getenv("DB_PATH", "backend/cardsavvy.db")
+DB_REPLICA_PATHS = [p.strip() for p in os.getenv("DB_REPLICA_PATHS", "").split(",") if p.strip()]
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+DB_REPLICA_PROBE_SECONDS = float(os.getenv("DB_REPLICA_PROBE_SECONDS", "2"))
+DB_STICKY_SECONDS = float(os.getenv("DB_STICKY_SECONDS", "5"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+# Pooled connections idle longer than this are pinged before reuse (Neon drops idle connections).
+DB_POOL_PING_AFTER_SECONDS = float(os.getenv("DB_POOL_PING_AFTER_SECONDS", "30"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+# Turn off behind poolers that cannot carry server-side prepared statements.
+DB_PREPARE_STATEMENTS = os.getenv("DB_PREPARE_STATEMENTS", "1") != "0"
 
 CATEGORIES = [
     "dining",
@@ -27,57 +43,329 @@ CATEGORIES = [
 ]
 
 
+class Query:
+    """A hot statement, normalized for both drivers once at declaration time."""
+
+    __slots__ = ("name", "sqlite", "postgres")
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sqlite = sql
+        self.postgres = sql.replace("?", "%s")
+
+
+QUERIES: dict[str, Query] = {}
+
+
+def register_query(name: str, sql: str) -> Query:
+    query = Query(name, sql)
+    QUERIES[name] = query
+    return query
+
+
+@lru_cache(maxsize=512)
+def _to_pyformat(query: str) -> str:
+    return query.replace("?", "%s")
+
+
+class KeyedRow:
+    """Tuple-backed row with sqlite3.Row-style access by column name or position."""
+
+    __slots__ = ("_values", "_index")
+
+    def __init__(self, values: Sequence[Any], index: dict[str, int]):
+        self._values = values
+        self._index = index
+
+    def __getitem__(self, key: str | int) -> Any:
+        if isinstance(key, str):
+            return self._values[self._index[key]]
+        return self._values[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        i = self._index.get(key)
+        return default if i is None else self._values[i]
+
+    def keys(self) -> list[str]:
+        return list(self._index)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+def keyed_row(cursor: Any) -> Callable[[Sequence[Any]], KeyedRow]:
+    index = {col.name: i for i, col in enumerate(cursor.description or ())}
+    return lambda values: KeyedRow(values, index)
+
+
 class DatabaseConnection:
-    def __init__(self, driver: str, conn: Any):
+    def __init__(self, driver: str, conn: Any, role: str = "primary", pool: queue.LifoQueue | None = None):
         self.driver = driver
         self.conn = conn
+        self.role = role
         self.cur = conn.cursor()
+        self._pool = pool
 
     def _normalize_query(self, query: str) -> str:
         if self.driver == "postgres":
-            return query.replace("?", "%s")
+            return _to_pyformat(query)
         return query
 
     def execute(self, query: str, params: Iterable[Any] = ()):
         sql = self._normalize_query(query)
-        self.cur.execute(sql, tuple(params))
-        return self.cur
+        with span("db"):
+            self.cur.execute(sql, tuple(params))
+        return self
+
+    def run(self, query: Query, params: Iterable[Any] = ()):
+        """Execute a registered query; prepared server-side on PostgreSQL."""
+        with span("db"):
+            if self.driver == "postgres":
+                self.cur.execute(query.postgres, tuple(params), prepare=DB_PREPARE_STATEMENTS)
+            else:
+                self.cur.execute(query.sqlite, tuple(params))
+        return self
 
     def cursor(self):
         return self
 
     def fetchone(self):
-        return self.cur.fetchone()
+        with span("db"):
+            return self.cur.fetchone()
 
     def fetchall(self):
-        return self.cur.fetchall()
+        with span("db"):
+            return self.cur.fetchall()
+
+    def stream(self, query: str, params: Iterable[Any] = (), size: int = 1000) -> Iterator[Any]:
+        """Yield rows in batches without loading the whole result; server-side cursor on PostgreSQL."""
+        if self.driver == "postgres":
+            cur = self.conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+            sql = self._normalize_query(query)
+        else:
+            cur = self.conn.cursor()
+            sql = query
+        try:
+            cur.execute(sql, tuple(params))
+            while True:
+                rows = cur.fetchmany(size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cur.close()
 
     def commit(self):
-        self.conn.commit()
+        with span("db"):
+            self.conn.commit()
 
     def close(self):
         try:
             self.cur.close()
         except Exception:
             pass
+        if self._pool is not None and not self.conn.closed:
+            # Pooled connections keep their prepared statements for the next request.
+            try:
+                self.conn.rollback()
+                self._pool.put_nowait((self.conn, time.monotonic()))
+                return
+            except Exception:
+                pass
         self.conn.close()
 
 
-def get_db() -> DatabaseConnection:
-    db_path = os.getenv("DB_PATH", DB_PATH)
+def _is_postgres(db_path: str) -> bool:
+    return db_path.startswith("postgres://") or db_path.startswith("postgresql://")
+
+
+_pg_pools: dict[str, queue.LifoQueue] = {}
+_pg_pools_lock = threading.Lock()
+
+
+def _pg_pool(db_path: str) -> queue.LifoQueue:
+    with _pg_pools_lock:
+        if db_path not in _pg_pools:
+            _pg_pools[db_path] = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+        return _pg_pools[db_path]
+
+
+def _checkout(pool: queue.LifoQueue) -> Any:
+    """Take a live pooled connection, discarding ones the server or network has closed."""
+    while True:
+        try:
+            conn, returned_at = pool.get_nowait()
+        except queue.Empty:
+            return None
+        if conn.closed or conn.broken:
+            continue
+        if time.monotonic() - returned_at >= DB_POOL_PING_AFTER_SECONDS:
+            try:
+                conn.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                continue
+        return conn
 
-    if db_path.startswith("postgres://") or db_path.startswith("postgresql://"):
+
+def _connect(db_path: str, role: str = "primary") -> DatabaseConnection:
+    with span("db"):
+        return _open(db_path, role)
+
+
+def _open(db_path: str, role: str) -> DatabaseConnection:
+    if _is_postgres(db_path):
         if psycopg is None:
             raise RuntimeError(
                 "PostgreSQL DB_PATH configured but psycopg is not installed. "
                 "Run: pip install -r requirements.txt"
             )
-        conn = psycopg.connect(db_path, row_factory=dict_row)
-        return DatabaseConnection("postgres", conn)
+        pool = _pg_pool(db_path)
+        conn = _checkout(pool)
+        if conn is None:
+            conn = psycopg.connect(db_path, row_factory=keyed_row)
+            if not DB_PREPARE_STATEMENTS:
+                # Also stop psycopg preparing repeated ad hoc statements on its own.
+                conn.prepare_threshold = None
+        return DatabaseConnection("postgres", conn, role, pool)
 
-    conn = sqlite3.connect(db_path)
+    if role == "replica":
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, cached_statements=SQLITE_STATEMENT_CACHE)
+    else:
+        conn = sqlite3.connect(db_path, cached_statements=SQLITE_STATEMENT_CACHE)
     conn.row_factory = sqlite3.Row
-    return DatabaseConnection("sqlite", conn)
+    return DatabaseConnection("sqlite", conn, role)
+
+
+def get_db() -> DatabaseConnection:
+    return _connect(os.getenv("DB_PATH", DB_PATH))
+
+
+class WriteMarks:
+    """Last write seen for the current request, carried between workers by the client."""
+
+    __slots__ = ("user_id", "written_at", "wrote")
+
+    def __init__(self, user_id: str | None = None, written_at: float = 0.0) -> None:
+        self.user_id = user_id
+        self.written_at = written_at
+        self.wrote = False
+
+
+write_marks: ContextVar[WriteMarks | None] = ContextVar("write_marks", default=None)
+
+
+class ReplicaRouter:
+    """Routes reads to healthy replicas, keeping users on the primary right after their own writes."""
+
+    def __init__(self, paths: list[str]):
+        self.paths = paths
+        self._lock = threading.Lock()
+        self._lag: dict[str, tuple[float | None, float]] = {}
+        self._recent_writes: dict[str, float] = {}
+        self._next = itertools.count()
+
+    def mark_write(self, user_id: str) -> None:
+        marks = write_marks.get()
+        if marks is not None:
+            marks.user_id, marks.written_at, marks.wrote = user_id, time.time(), True
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[user_id] = now
+            if len(self._recent_writes) > 10000:
+                self._recent_writes = {
+                    k: v for k, v in self._recent_writes.items() if now - v < DB_STICKY_SECONDS
+                }
+
+    def _is_sticky(self, user_id: str | None) -> bool:
+        if user_id is None:
+            return False
+        marks = write_marks.get()
+        # Wall clocks differ slightly between instances; allow a second of skew.
+        if marks is not None and marks.user_id == user_id and -1.0 <= time.time() - marks.written_at < DB_STICKY_SECONDS:
+            return True
+        with self._lock:
+            written_at = self._recent_writes.get(user_id)
+        return written_at is not None and time.monotonic() - written_at < DB_STICKY_SECONDS
+
+    def _probe_lag(self, conn: DatabaseConnection) -> float:
+        if conn.driver == "postgres":
+            row = conn.execute(
+                """
+                SELECT CASE
+                  WHEN NOT pg_is_in_recovery() THEN 0
+                  WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                  ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                END AS lag
+                """
+            ).fetchone()
+            return float(row["lag"])
+        # SQLite copies have no replication stream; reachable means usable.
+        conn.execute("SELECT 1").fetchone()
+        return 0.0
+
+    def connect(self, user_id: str | None = None) -> DatabaseConnection:
+        if not self.paths or self._is_sticky(user_id):
+            return get_db()
+
+        start = next(self._next)
+        now = time.monotonic()
+        for offset in range(len(self.paths)):
+            path = self.paths[(start + offset) % len(self.paths)]
+            lag, checked_at = self._lag.get(path, (0.0, -DB_REPLICA_PROBE_SECONDS))
+            fresh = now - checked_at < DB_REPLICA_PROBE_SECONDS
+            if fresh and (lag is None or lag > DB_REPLICA_MAX_LAG_SECONDS):
+                continue
+            try:
+                conn = _connect(path, role="replica")
+            except Exception:
+                self._lag[path] = (None, now)
+                continue
+            if not fresh:
+                try:
+                    lag = self._probe_lag(conn)
+                except Exception:
+                    lag = None
+                self._lag[path] = (lag, now)
+                if lag is None or lag > DB_REPLICA_MAX_LAG_SECONDS:
+                    conn.close()
+                    continue
+            return conn
+        return get_db()
+
+    def status(self) -> list[dict[str, Any]]:
+        return [
+            {"replica": i, "lag_seconds": self._lag.get(path, (0.0, 0.0))[0]}
+            for i, path in enumerate(self.paths)
+        ]
+
+
+replica_router = ReplicaRouter(DB_REPLICA_PATHS)
+
+
+def get_read_db(user_id: str | None = None) -> DatabaseConnection:
+    """Connection for read-only work; pass user_id so the user's own writes stay visible."""
+    return replica_router.connect(user_id)
+
+
+def mark_user_write(user_id: str) -> None:
+    replica_router.mark_write(user_id)
+
+
+def _add_column(conn: DatabaseConnection, table: str, column: str, decl: str) -> None:
+    if conn.driver == "postgres":
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {decl}")
+        return
+    columns = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
 
 
 def init_db() -> None:
@@ -93,6 +381,12 @@ def init_db() -> None:
         )
         """,
         """
+        CREATE TABLE IF NOT EXISTS admin_users (
+          user_id TEXT PRIMARY KEY,
+          granted_at TEXT NOT NULL
+        )
+        """,
+        """
         CREATE TABLE IF NOT EXISTS card_catalog (
           id TEXT PRIMARY KEY,
           card_name TEXT NOT NULL,
@@ -108,6 +402,14 @@ def init_db() -> None:
           UNIQUE(card_name, issuer)
         )
         """,
+        "CREATE INDEX IF NOT EXISTS card_catalog_status_updated_idx ON card_catalog (verification_status, updated_at)",
+        """
+        CREATE TABLE IF NOT EXISTS card_refresh_state (
+          card_catalog_id TEXT PRIMARY KEY,
+          checked_at TEXT NOT NULL,
+          last_status TEXT NOT NULL
+        )
+        """,
         """
         CREATE TABLE IF NOT EXISTS user_cards (
           id TEXT PRIMARY KEY,
@@ -121,21 +423,70 @@ def init_db() -> None:
         )
         """,
         """
-        CREATE TABLE IF NOT EXISTS lookup_audit (
+        CREATE TABLE IF NOT EXISTS audit_partitions (
+          name TEXT PRIMARY KEY,
+          range_start TEXT NOT NULL,
+          range_end TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS wallet_snapshots (
+          user_id TEXT PRIMARY KEY,
+          version INTEGER NOT NULL,
+          payload_json TEXT NOT NULL,
+          source_version TEXT,
+          updated_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS transactions (
           id TEXT PRIMARY KEY,
           user_id TEXT NOT NULL,
-          query_card_name TEXT NOT NULL,
-          query_issuer TEXT,
-          status TEXT NOT NULL,
-          payload_json TEXT,
+          merchant TEXT NOT NULL,
+          category TEXT NOT NULL,
+          amount DOUBLE PRECISION NOT NULL,
+          card_catalog_id TEXT NOT NULL,
+          reward_earned DOUBLE PRECISION NOT NULL,
+          reward_best DOUBLE PRECISION NOT NULL,
+          month TEXT NOT NULL,
           created_at TEXT NOT NULL
         )
         """,
+        "CREATE INDEX IF NOT EXISTS transactions_user_created_idx ON transactions (user_id, created_at)",
+        """
+        CREATE TABLE IF NOT EXISTS reward_rollups (
+          user_id TEXT NOT NULL,
+          month TEXT NOT NULL,
+          category TEXT NOT NULL,
+          txn_count INTEGER NOT NULL,
+          amount_total DOUBLE PRECISION NOT NULL,
+          reward_earned DOUBLE PRECISION NOT NULL,
+          reward_best DOUBLE PRECISION NOT NULL,
+          PRIMARY KEY (user_id, month, category)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS job_leases (
+          name TEXT PRIMARY KEY,
+          holder TEXT NOT NULL,
+          expires_at DOUBLE PRECISION NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+          bucket_key TEXT PRIMARY KEY,
+          tokens DOUBLE PRECISION NOT NULL,
+          updated_at DOUBLE PRECISION NOT NULL
+        )
+        """,
     ]
 
     for stmt in ddl:
         conn.execute(stmt)
 
+    # Columns added after their table first shipped.
+    _add_column(conn, "wallet_snapshots", "source_version", "TEXT")
+
     now = now_ts()
     for item in CURATED_CARDS:
         conn.execute(
@@ -165,6 +516,11 @@ def now_ts() -> str:
 
 
 def row_to_card(row: Mapping[str, Any]) -> dict[str, Any]:
+    with span("decode"):
+        return _row_to_card(row)
+
+
+def _row_to_card(row: Mapping[str, Any]) -> dict[str, Any]:
     reward_rules_value = row["reward_rules_json"]
     if isinstance(reward_rules_value, str):
         reward_rules = json.loads(reward_rules_value)
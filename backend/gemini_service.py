@@ -1,11 +1,16 @@
 import json
 import os
 import re
+import socket
+import threading
 import urllib.error
 import urllib.parse
 import urllib.request
-from typing import Any
+from contextlib import contextmanager
+from typing import Any, Iterator
 
+from profiling import span
+from resilience import CircuitBreaker, RetryableError, call_with_retries, hedged
 
 CATEGORY_KEYS = [
     "dining",
@@ -18,6 +23,50 @@ CATEGORY_KEYS = [
     "others",
 ]
 
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_QUEUE = int(os.getenv("GEMINI_MAX_QUEUE", "16"))
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "10"))
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", "30"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+GEMINI_HEDGE_DELAY_SECONDS = float(os.getenv("GEMINI_HEDGE_DELAY_SECONDS", "0"))
+
+gemini_breaker = CircuitBreaker(
+    "gemini",
+    failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30")),
+)
+
+_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+_queue_lock = threading.Lock()
+_queued = 0
+
+
+class GeminiBusyError(RuntimeError):
+    """Raised when no outbound Gemini slot frees up within the queue limits."""
+
+
+@contextmanager
+def _gemini_slot(wait: bool = True) -> Iterator[None]:
+    global _queued
+    if not _slots.acquire(blocking=False):
+        if not wait:
+            raise GeminiBusyError("No idle Gemini slot")
+        with _queue_lock:
+            if _queued >= GEMINI_MAX_QUEUE:
+                raise GeminiBusyError("Gemini wait queue is full")
+            _queued += 1
+        try:
+            acquired = _slots.acquire(timeout=GEMINI_QUEUE_TIMEOUT)
+        finally:
+            with _queue_lock:
+                _queued -= 1
+        if not acquired:
+            raise GeminiBusyError("Timed out waiting for a Gemini slot")
+    try:
+        yield
+    finally:
+        _slots.release()
+
 
 def _api_key() -> str:
     return os.getenv("GEMINI_API_KEY", "").strip()
@@ -27,6 +76,10 @@ def _model() -> str:
     return os.getenv("GEMINI_MODEL", "gemini-2.5-flash").strip()
 
 
+def _api_base() -> str:
+    return os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com").strip().rstrip("/")
+
+
 def _extract_text(response_json: dict[str, Any]) -> str:
     candidates = response_json.get("candidates", [])
     if not candidates:
@@ -52,13 +105,26 @@ def _extract_grounding_urls(response_json: dict[str, Any]) -> list[str]:
     return urls[:8]
 
 
-def _call_gemini(prompt: str, tools: list[dict[str, Any]] | None = None) -> dict[str, Any]:
+def _post_gemini(req: urllib.request.Request, timeout: float, wait: bool = True) -> dict[str, Any]:
+    try:
+        with _gemini_slot(wait), urllib.request.urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as error:
+        detail = error.read().decode("utf-8", errors="ignore")
+        if error.code == 429 or error.code >= 500:
+            raise RetryableError(f"Gemini HTTP error: {error.code} {detail}") from error
+        raise RuntimeError(f"Gemini HTTP error: {error.code} {detail}") from error
+    except (urllib.error.URLError, socket.timeout, ConnectionError) as error:
+        raise RetryableError(f"Gemini request failed: {error}") from error
+
+
+def _call_gemini(prompt: str, tools: list[dict[str, Any]] | None = None, hedge: bool = False) -> dict[str, Any]:
     key = _api_key()
     if not key:
         raise ValueError("GEMINI_API_KEY is not configured")
 
     endpoint = (
-        f"https://generativelanguage.googleapis.com/v1beta/models/"
+        f"{_api_base()}/v1beta/models/"
         f"{urllib.parse.quote(_model())}:generateContent?key={urllib.parse.quote(key)}"
     )
 
@@ -74,12 +140,24 @@ def _call_gemini(prompt: str, tools: list[dict[str, Any]] | None = None) -> dict
         headers={"Content-Type": "application/json"},
         method="POST",
     )
-    try:
-        with urllib.request.urlopen(req, timeout=30) as response:
-            return json.loads(response.read().decode("utf-8"))
-    except urllib.error.HTTPError as error:
-        detail = error.read().decode("utf-8", errors="ignore")
-        raise RuntimeError(f"Gemini HTTP error: {error.code} {detail}") from error
+
+    def attempt(timeout: float) -> dict[str, Any]:
+        if hedge and GEMINI_HEDGE_DELAY_SECONDS > 0:
+            # The backup only runs if a slot is idle, so hedging never queues behind real traffic.
+            return hedged(
+                lambda: _post_gemini(req, timeout),
+                lambda: _post_gemini(req, timeout, wait=False),
+                GEMINI_HEDGE_DELAY_SECONDS,
+            )
+        return _post_gemini(req, timeout)
+
+    with span("gemini"):
+        return call_with_retries(
+            attempt,
+            gemini_breaker,
+            deadline_seconds=GEMINI_DEADLINE_SECONDS,
+            max_attempts=GEMINI_MAX_ATTEMPTS,
+        )
 
 
 def generate_chat_reply(message: str, verified_wallet_cards: list[dict[str, Any]]) -> str:
@@ -94,7 +172,7 @@ def generate_chat_reply(message: str, verified_wallet_cards: list[dict[str, Any]
         "- Mention category and reward percentage when possible.\n"
     )
 
-    response_json = _call_gemini(prompt)
+    response_json = _call_gemini(prompt, hedge=True)
     text = _extract_text(response_json)
     if not text:
         return "I could not generate a recommendation right now."
@@ -134,8 +212,17 @@ def extract_card_from_web(card_name: str, issuer: str, network: str | None = Non
     match = re.search(r"\{.*\}", text, flags=re.DOTALL)
     raw_json = match.group(0) if match else text
     parsed = json.loads(raw_json)
+    return _sanitize_extraction(parsed, card_name, issuer, network, urls)
+
 
-    reward_rules = parsed.get("reward_rules", {}) if isinstance(parsed, dict) else {}
+def _sanitize_extraction(
+    parsed: Any, card_name: str, issuer: str, network: str | None, urls: list[str]
+) -> dict[str, Any]:
+    if not isinstance(parsed, dict):
+        parsed = {}
+    reward_rules = parsed.get("reward_rules", {})
+    if not isinstance(reward_rules, dict):
+        reward_rules = {}
     sanitized_rules: dict[str, float] = {}
     for key in CATEGORY_KEYS:
         value = reward_rules.get(key, 0.01)
@@ -145,7 +232,7 @@ def extract_card_from_web(card_name: str, issuer: str, network: str | None = Non
             number = 0.01
         sanitized_rules[key] = max(0.0, min(1.0, number))
 
-    confidence = parsed.get("confidence", 0.5) if isinstance(parsed, dict) else 0.5
+    confidence = parsed.get("confidence", 0.5)
     try:
         confidence_value = max(0.0, min(1.0, float(confidence)))
     except (TypeError, ValueError):
@@ -162,3 +249,69 @@ def extract_card_from_web(card_name: str, issuer: str, network: str | None = Non
             "notes": str(parsed.get("notes") or "Extracted from web search using Gemini."),
         },
     }
+
+
+def extract_cards_from_web(cards: list[dict[str, Any]]) -> list[dict[str, Any] | None]:
+    """Extract reward rules for several cards with one grounded call.
+
+    Returns one entry per input card, in order; None where the answer had no usable item.
+    evidence.urls holds the sources the model cited for that card, evidence.batch_urls the
+    grounding pages of the whole call.
+    """
+    refs = [
+        {"ref": i, "card_name": c["card_name"], "issuer": c["issuer"], "network": c.get("network") or ""}
+        for i, c in enumerate(cards)
+    ]
+    prompt = (
+        "Find rewards details for each credit card below using web search and return ONLY a JSON array "
+        "with one object per card, echoing its ref.\n"
+        f"CARDS_JSON: {json.dumps(refs)}\n\n"
+        "Required JSON shape for each array item:\n"
+        "{\n"
+        '  "ref": 0,\n'
+        '  "reward_rules": {\n'
+        '    "dining": 0.00,\n'
+        '    "groceries": 0.00,\n'
+        '    "shopping": 0.00,\n'
+        '    "travel": 0.00,\n'
+        '    "fuel": 0.00,\n'
+        '    "utilities": 0.00,\n'
+        '    "entertainment": 0.00,\n'
+        '    "others": 0.00\n'
+        "  },\n"
+        '  "confidence": 0.0,\n'
+        '  "sources": ["url of a page you used for THIS card"],\n'
+        '  "notes": "string"\n'
+        "}\n\n"
+        "Use decimal rates from 0 to 1 where 0.05 means 5%. "
+        "If exact category value is unknown, use a conservative estimate and mention uncertainty in notes."
+    )
+
+    response_json = _call_gemini(prompt, tools=[{"google_search": {}}])
+    text = _extract_text(response_json)
+    # Grounding metadata covers the whole answer, not one card; keep it apart from per-card sources.
+    shared_urls = _extract_grounding_urls(response_json)
+
+    match = re.search(r"\[.*\]", text, flags=re.DOTALL)
+    parsed = json.loads(match.group(0) if match else text)
+    by_ref = {}
+    for item in parsed if isinstance(parsed, list) else []:
+        if isinstance(item, dict) and isinstance(item.get("ref"), int):
+            by_ref[item["ref"]] = item
+
+    results: list[dict[str, Any] | None] = []
+    for i, card in enumerate(cards):
+        item = by_ref.get(i)
+        if item is None or not isinstance(item.get("reward_rules"), dict):
+            results.append(None)
+            continue
+        sources = item.get("sources")
+        urls = [u for u in sources if isinstance(u, str) and u.startswith(("http://", "https://"))][:8] if isinstance(sources, list) else []
+        result = _sanitize_extraction(item, card["card_name"], card["issuer"], card.get("network"), urls)
+        result["evidence"]["batch_urls"] = shared_urls
+        results.append(result)
+    return results
+
+
+def gemini_configured() -> bool:
+    return bool(_api_key())
@@ -6,8 +6,15 @@ from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
 
+from audit import AUDIT_RETENTION_INTERVAL_SECONDS, archive_expired_partitions, init_audit_storage
+from card_refresher import CARD_REFRESH_INTERVAL_SECONDS, refresh_cards
+from compression import CompressionMiddleware
 from database import init_db
+from gemini_service import gemini_configured
+from profiling import SlowRequestMiddleware
 from routes import api_router
+from scheduler import start_periodic, stop_all
+from sticky_reads import StickyReadsMiddleware
 
 app = FastAPI(title="CardSavvy Backend (Python)")
 app.add_middleware(
@@ -17,6 +24,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(StickyReadsMiddleware)
+app.add_middleware(SlowRequestMiddleware)
 
 app.include_router(api_router)
 
@@ -27,3 +37,12 @@ def startup() -> None:
     if not (db_path.startswith("postgres://") or db_path.startswith("postgresql://")):
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
     init_db()
+    init_audit_storage()
+    start_periodic("audit-retention", AUDIT_RETENTION_INTERVAL_SECONDS, archive_expired_partitions)
+    if gemini_configured():
+        start_periodic("card-refresh", CARD_REFRESH_INTERVAL_SECONDS, refresh_cards, exclusive=True)
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    stop_all()
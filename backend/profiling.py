@@ -0,0 +1,149 @@
+import collections
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "200"))
+MAX_PROFILE_SECONDS = 60.0
+
+
+class RequestTrace:
+    __slots__ = ("spans",)
+
+    def __init__(self) -> None:
+        self.spans: dict[str, list[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+
+_trace: ContextVar[RequestTrace | None] = ContextVar("request_trace", default=None)
+
+
+class span:
+    """Time a block into the current request's trace; a no-op outside traced requests."""
+
+    __slots__ = ("name", "trace", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace = _trace.get()
+
+    def __enter__(self) -> "span":
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter() - self.started)
+
+
+_slow_requests: collections.deque[dict[str, Any]] = collections.deque(maxlen=SLOW_REQUEST_BUFFER)
+
+
+def slow_requests(limit: int = 50, path: str | None = None) -> list[dict[str, Any]]:
+    entries = [e for e in reversed(_slow_requests) if path is None or e["path"] == path]
+    return entries[:limit]
+
+
+class SlowRequestMiddleware:
+    """Records the span breakdown of requests slower than SLOW_REQUEST_MS into a ring buffer.
+
+    Event streams are timed to their first body chunk: the rest is paced delivery to the client,
+    and counting it would fill the buffer with every chat reply.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or SLOW_REQUEST_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _trace.set(trace)
+        started_at = datetime.now(timezone.utc).isoformat()
+        started = time.perf_counter()
+        status = 0
+        streamed = False
+        first_chunk_at: float | None = None
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal status, streamed, first_chunk_at
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streamed = any(
+                    key.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for key, value in message.get("headers", ())
+                )
+            elif streamed and first_chunk_at is None and message.get("body"):
+                first_chunk_at = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _trace.reset(token)
+            duration_ms = ((first_chunk_at or time.perf_counter()) - started) * 1000
+            if duration_ms >= SLOW_REQUEST_MS:
+                spans = {name: {"count": int(c), "ms": round(s * 1000, 2)} for name, (c, s) in trace.spans.items()}
+                _slow_requests.append(
+                    {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "started_at": started_at,
+                        "duration_ms": round(duration_ms, 2),
+                        "streamed": streamed,
+                        "spans": spans,
+                        "unaccounted_ms": round(duration_ms - sum(v["ms"] for v in spans.values()), 2),
+                    }
+                )
+
+
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> str:
+    """Sample every thread's stack for `seconds` and return flamegraph collapsed stacks.
+
+    Raises RuntimeError if another profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        me = threading.get_ident()
+        counts: collections.Counter[str] = collections.Counter()
+        deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
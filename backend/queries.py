@@ -0,0 +1,123 @@
+from database import register_query
+
+CATALOG_BY_STATUS = register_query(
+    "catalog_by_status",
+    "SELECT * FROM card_catalog WHERE verification_status = ? ORDER BY updated_at DESC",
+)
+
+CATALOG_VERSION = register_query(
+    "catalog_version",
+    "SELECT COUNT(*) AS card_count, MAX(updated_at) AS last_updated FROM card_catalog WHERE verification_status = ?",
+)
+
+CARD_BY_ID = register_query("card_by_id", "SELECT * FROM card_catalog WHERE id = ?")
+
+CARD_ID_BY_ID = register_query("card_id_by_id", "SELECT id FROM card_catalog WHERE id = ?")
+
+VERIFIED_CARD_BY_NAME_ISSUER = register_query(
+    "verified_card_by_name_issuer",
+    """
+    SELECT * FROM card_catalog
+    WHERE lower(card_name) = lower(?) AND lower(issuer) = lower(?) AND verification_status = 'verified'
+    LIMIT 1
+    """,
+)
+
+CARD_ID_BY_NAME_ISSUER = register_query(
+    "card_id_by_name_issuer",
+    "SELECT id FROM card_catalog WHERE lower(card_name)=lower(?) AND lower(issuer)=lower(?) LIMIT 1",
+)
+
+WALLET_CARDS = register_query(
+    "wallet_cards",
+    """
+    SELECT c.* FROM user_cards u
+    INNER JOIN card_catalog c ON c.id = u.card_catalog_id
+    WHERE u.user_id = ? AND u.is_active = 1
+    ORDER BY u.created_at DESC
+    """,
+)
+
+INSERT_USER_CARD = register_query(
+    "insert_user_card",
+    """
+    INSERT INTO user_cards (id, user_id, card_catalog_id, nickname, last_four, is_active, created_at)
+    VALUES (?, ?, ?, ?, ?, 1, ?)
+    ON CONFLICT(user_id, card_catalog_id) DO NOTHING
+    """,
+)
+
+INSERT_LOOKUP_AUDIT = register_query(
+    "insert_lookup_audit",
+    "INSERT INTO lookup_audit (id, user_id, query_card_name, query_issuer, status, payload_json, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+)
+
+WALLET_SOURCE_VERSION = register_query(
+    "wallet_source_version",
+    """
+    SELECT COUNT(*) AS card_count,
+           SUM(CASE WHEN c.verification_status = 'verified' THEN 1 ELSE 0 END) AS verified_count,
+           MAX(c.updated_at) AS last_updated
+    FROM user_cards u
+    INNER JOIN card_catalog c ON c.id = u.card_catalog_id
+    WHERE u.user_id = ? AND u.is_active = 1
+    """,
+)
+
+SNAPSHOT_BY_USER = register_query(
+    "snapshot_by_user",
+    "SELECT version, payload_json, source_version FROM wallet_snapshots WHERE user_id = ?",
+)
+
+UPSERT_SNAPSHOT = register_query(
+    "upsert_snapshot",
+    """
+    INSERT INTO wallet_snapshots (user_id, version, payload_json, source_version, updated_at)
+    VALUES (?, 1, ?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+      version = wallet_snapshots.version + 1,
+      payload_json = excluded.payload_json,
+      source_version = excluded.source_version,
+      updated_at = excluded.updated_at
+    """,
+)
+
+INSERT_TRANSACTION = register_query(
+    "insert_transaction",
+    """
+    INSERT INTO transactions
+    (id, user_id, merchant, category, amount, card_catalog_id, reward_earned, reward_best, month, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+)
+
+UPSERT_REWARD_ROLLUP = register_query(
+    "upsert_reward_rollup",
+    """
+    INSERT INTO reward_rollups (user_id, month, category, txn_count, amount_total, reward_earned, reward_best)
+    VALUES (?, ?, ?, 1, ?, ?, ?)
+    ON CONFLICT(user_id, month, category) DO UPDATE SET
+      txn_count = reward_rollups.txn_count + 1,
+      amount_total = reward_rollups.amount_total + excluded.amount_total,
+      reward_earned = reward_rollups.reward_earned + excluded.reward_earned,
+      reward_best = reward_rollups.reward_best + excluded.reward_best
+    """,
+)
+
+REWARD_ROLLUPS = register_query(
+    "reward_rollups",
+    """
+    SELECT category, txn_count, amount_total, reward_earned, reward_best
+    FROM reward_rollups WHERE user_id = ? AND month = ?
+    """,
+)
+
+USER_BY_EMAIL = register_query(
+    "user_by_email",
+    "SELECT id, email, password_hash FROM users WHERE email = ?",
+)
+
+ADMIN_BY_USER_ID = register_query(
+    "admin_by_user_id",
+    "SELECT user_id FROM admin_users WHERE user_id = ?",
+)
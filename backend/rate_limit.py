@@ -0,0 +1,146 @@
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+from fastapi import Depends, HTTPException, Request
+
+from auth import require_user
+from database import get_db
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+RATE_LIMIT_CAPACITY = float(os.getenv("RATE_LIMIT_CAPACITY", "60"))
+RATE_LIMIT_REFILL_PER_SEC = float(os.getenv("RATE_LIMIT_REFILL_PER_SEC", "1"))
+# Reverse proxies in front of the app that append to X-Forwarded-For (1 on Render).
+RATE_LIMIT_TRUSTED_PROXY_HOPS = int(os.getenv("RATE_LIMIT_TRUSTED_PROXY_HOPS", "0"))
+
+# Token cost per route; a bucket holds RATE_LIMIT_CAPACITY tokens.
+ROUTE_COSTS = {
+    "analyze": 1.0,
+    "chat": 5.0,
+    "lookup": 20.0,
+}
+
+MAX_MEMORY_BUCKETS = 50000
+
+
+def check_route_costs(costs: dict[str, float], capacity: float) -> None:
+    """A route costing more than a full bucket would answer 429 to every request."""
+    too_costly = sorted(route for route, cost in costs.items() if cost > capacity)
+    if too_costly:
+        raise RuntimeError(
+            f"RATE_LIMIT_CAPACITY={capacity:g} is below the cost of {', '.join(too_costly)}; "
+            f"set it to at least {max(costs.values()):g}"
+        )
+
+
+check_route_costs(ROUTE_COSTS, RATE_LIMIT_CAPACITY)
+
+
+def _refill(tokens: float, updated_at: float, now: float) -> float:
+    return min(RATE_LIMIT_CAPACITY, tokens + (now - updated_at) * RATE_LIMIT_REFILL_PER_SEC)
+
+
+def _retry_after(tokens: float, cost: float) -> float:
+    if RATE_LIMIT_REFILL_PER_SEC <= 0:
+        return 60.0
+    return (cost - tokens) / RATE_LIMIT_REFILL_PER_SEC
+
+
+class MemoryBucketStore:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, keys: Iterable[str], cost: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            levels = {}
+            for key in keys:
+                tokens, updated_at = self._buckets.get(key, (RATE_LIMIT_CAPACITY, now))
+                levels[key] = _refill(tokens, updated_at, now)
+
+            wait = max(_retry_after(tokens, cost) for tokens in levels.values())
+            if wait > 0:
+                return wait
+
+            for key, tokens in levels.items():
+                self._buckets[key] = (tokens - cost, now)
+            if len(self._buckets) > MAX_MEMORY_BUCKETS:
+                self._prune(now)
+            return 0.0
+
+    def _prune(self, now: float) -> None:
+        full = [
+            key
+            for key, (tokens, updated_at) in self._buckets.items()
+            if _refill(tokens, updated_at, now) >= RATE_LIMIT_CAPACITY
+        ]
+        for key in full:
+            del self._buckets[key]
+
+
+class DatabaseBucketStore:
+    """Shares buckets across workers through the rate_limit_buckets table."""
+
+    def take(self, keys: Iterable[str], cost: float) -> float:
+        keys = sorted(keys)
+        now = time.time()
+        conn = get_db()
+        try:
+            if conn.driver == "sqlite":
+                conn.execute("BEGIN IMMEDIATE")
+            levels = {}
+            for key in keys:
+                conn.execute(
+                    "INSERT INTO rate_limit_buckets (bucket_key, tokens, updated_at) VALUES (?, ?, ?) ON CONFLICT(bucket_key) DO NOTHING",
+                    (key, RATE_LIMIT_CAPACITY, now),
+                )
+                lock_clause = " FOR UPDATE" if conn.driver == "postgres" else ""
+                row = conn.execute(
+                    f"SELECT tokens, updated_at FROM rate_limit_buckets WHERE bucket_key = ?{lock_clause}",
+                    (key,),
+                ).fetchone()
+                levels[key] = _refill(float(row["tokens"]), float(row["updated_at"]), now)
+
+            wait = max(_retry_after(tokens, cost) for tokens in levels.values())
+            if wait <= 0:
+                for key, tokens in levels.items():
+                    conn.execute(
+                        "UPDATE rate_limit_buckets SET tokens = ?, updated_at = ? WHERE bucket_key = ?",
+                        (tokens - cost, now, key),
+                    )
+            conn.commit()
+            return max(wait, 0.0)
+        finally:
+            conn.close()
+
+
+_store = DatabaseBucketStore() if RATE_LIMIT_BACKEND == "db" else MemoryBucketStore()
+
+
+def client_ip(request: Request) -> str:
+    """The caller's address, taken from X-Forwarded-For only as far as trusted proxies wrote it."""
+    if RATE_LIMIT_TRUSTED_PROXY_HOPS > 0:
+        forwarded = [a.strip() for a in request.headers.get("x-forwarded-for", "").split(",") if a.strip()]
+        if forwarded:
+            # Entries left of the ones our proxies appended are client-controlled.
+            return forwarded[-min(RATE_LIMIT_TRUSTED_PROXY_HOPS, len(forwarded))]
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(route: str) -> Callable[..., dict[str, Any]]:
+    cost = ROUTE_COSTS[route]
+
+    def dependency(request: Request, user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
+        wait = _store.take([f"user:{user['sub']}", f"ip:{client_ip(request)}"], cost)
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests. Please slow down.",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+        return user
+
+    return dependency
@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open")
+        self.retry_after = retry_after
+
+
+class RetryableError(RuntimeError):
+    """An attempt failed in a way that another attempt may fix (timeouts, 429, 5xx)."""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failed calls, then lets a single probe through after reset_timeout."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == "closed":
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self._state == "open" and elapsed >= self.reset_timeout:
+                self._state = "half_open"
+            if self._state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def release(self) -> None:
+        """End a call that says nothing about upstream health."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._trips += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "retry_after": (
+                    round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+                    if self._state == "open"
+                    else 0.0
+                ),
+            }
+
+
+def call_with_retries(
+    attempt: Callable[[float], T],
+    breaker: CircuitBreaker,
+    deadline_seconds: float,
+    max_attempts: int = 3,
+    base_delay: float = 0.25,
+    max_delay: float = 4.0,
+    attempt_timeout: float = 20.0,
+) -> T:
+    """Call attempt(timeout) until it succeeds, the deadline passes or attempts run out.
+
+    Only RetryableError is retried. A call counts once against the breaker, when its retries
+    run out; a failed half-open probe reopens it at once. Any other exception propagates
+    immediately without changing breaker state.
+    """
+    deadline = time.monotonic() + deadline_seconds
+    for number in range(max_attempts):
+        remaining = deadline - time.monotonic()
+        breaker.before_call()
+        try:
+            result = attempt(min(attempt_timeout, remaining))
+        except RetryableError:
+            backoff = random.uniform(0, min(max_delay, base_delay * 2**number))
+            if (
+                number + 1 >= max_attempts
+                or deadline - time.monotonic() - backoff < 0.5
+                or breaker.state != "closed"
+            ):
+                breaker.record_failure()
+                raise
+            time.sleep(backoff)
+            continue
+        except Exception:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+    raise AssertionError("unreachable")
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+def hedged(primary: Callable[[], T], backup: Callable[[], T], delay: float) -> T:
+    """Start backup if primary has not finished after delay; return the first success."""
+    futures: list[Future[T]] = [_hedge_pool.submit(primary)]
+    done, _ = wait(futures, timeout=delay)
+    if not done:
+        futures.append(_hedge_pool.submit(backup))
+
+    error: BaseException | None = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            # Prefer the primary's error; a busy or failed backup says little.
+            if error is None or future is futures[0]:
+                error = future.exception()
+    assert error is not None
+    raise error
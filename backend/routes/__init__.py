@@ -1,14 +1,20 @@
 from fastapi import APIRouter
 
+from routes.admin import router as admin_router
 from routes.health import router as health_router
 from routes.auth import router as auth_router
 from routes.cards import router as cards_router
 from routes.analyze import router as analyze_router
+from routes.analytics import router as analytics_router
 from routes.chat import router as chat_router
+from routes.wallet import router as wallet_router
 
 api_router = APIRouter()
 api_router.include_router(health_router)
 api_router.include_router(auth_router)
 api_router.include_router(cards_router)
 api_router.include_router(analyze_router)
+api_router.include_router(analytics_router)
 api_router.include_router(chat_router)
+api_router.include_router(wallet_router)
+api_router.include_router(admin_router)
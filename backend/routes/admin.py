@@ -0,0 +1,57 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from audit import query_audit
+from auth import require_admin
+from card_refresher import refresh_cards
+from database import get_read_db
+from profiling import MAX_PROFILE_SECONDS, sample_stacks, slow_requests
+
+router = APIRouter()
+
+
+@router.get("/api/admin/profile", response_class=PlainTextResponse)
+def profile(seconds: float = 10, interval_ms: float = 10, user: dict[str, Any] = Depends(require_admin)) -> PlainTextResponse:
+    _ = user
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS:.0f}")
+    try:
+        stacks = sample_stacks(seconds, max(1.0, interval_ms) / 1000)
+    except RuntimeError as error:
+        raise HTTPException(status_code=409, detail=str(error))
+    return PlainTextResponse(
+        stacks,
+        headers={"Content-Disposition": 'attachment; filename="cardsavvy.collapsed"'},
+    )
+
+
+@router.get("/api/admin/slow-requests")
+def list_slow_requests(limit: int = 50, path: str | None = None, user: dict[str, Any] = Depends(require_admin)) -> dict[str, Any]:
+    _ = user
+    return {"requests": slow_requests(max(1, min(limit, 500)), path)}
+
+
+@router.get("/api/admin/audit")
+def list_audit(
+    user_id: str,
+    start: str,
+    end: str,
+    limit: int = 100,
+    user: dict[str, Any] = Depends(require_admin),
+) -> dict[str, Any]:
+    _ = user
+    conn = get_read_db()
+    rows = query_audit(conn, user_id, start, end, max(1, min(limit, 1000)))
+    conn.close()
+    return {"entries": rows}
+
+
+@router.post("/api/admin/cards/refresh")
+def run_card_refresh(max_calls: int | None = None, user: dict[str, Any] = Depends(require_admin)) -> dict[str, Any]:
+    _ = user
+    try:
+        return refresh_cards(max_calls=None if max_calls is None else max(0, min(max_calls, 100)))
+    except RuntimeError as error:
+        raise HTTPException(status_code=409, detail=str(error))
@@ -0,0 +1,24 @@
+import re
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from auth import require_user
+from database import get_db, now_ts
+from transactions import month_of, reward_summary
+
+router = APIRouter()
+
+MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+@router.get("/api/analytics/rewards")
+def rewards(month: str | None = None, user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
+    month = month or month_of(now_ts())
+    if not MONTH_RE.match(month):
+        raise HTTPException(status_code=400, detail="month must be formatted as YYYY-MM")
+    # Read from the primary so a purchase just sent to /api/analyze is already counted.
+    conn = get_db()
+    summary = reward_summary(conn, user["sub"], month)
+    conn.close()
+    return summary
@@ -2,27 +2,22 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 
-from auth import require_user
-from database import get_db, row_to_card
+from database import get_db, get_read_db
+from rate_limit import rate_limit
 from schemas import AnalyzeReq
+from transactions import record_transaction
+from wallet_snapshot import get_wallet_snapshot
 
 router = APIRouter()
 
 
 @router.post("/api/analyze")
-def analyze(body: AnalyzeReq, user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
-    conn = get_db()
-    rows = conn.execute(
-        """
-        SELECT c.* FROM user_cards u
-        INNER JOIN card_catalog c ON c.id = u.card_catalog_id
-        WHERE u.user_id = ? AND u.is_active = 1 AND c.verification_status = 'verified'
-        """,
-        (user["sub"],),
-    ).fetchall()
+def analyze(body: AnalyzeReq, user: dict[str, Any] = Depends(rate_limit("analyze"))) -> dict[str, Any]:
+    conn = get_read_db(user["sub"])
+    _, snapshot = get_wallet_snapshot(conn, user["sub"])
     conn.close()
 
-    if not rows:
+    if not any(c["verification_status"] == "verified" for c in snapshot["cards"]):
         raise HTTPException(status_code=400, detail="No verified cards found in wallet")
 
     merchant = body.merchant.lower()
@@ -34,16 +29,25 @@ def analyze(body: AnalyzeReq, user: dict[str, Any] = Depends(require_user)) -> d
     elif any(k in merchant for k in ["dmart", "grocery", "bigbasket"]):
         category = "groceries"
 
-    cards = [row_to_card(r) for r in rows]
-    best = max(cards, key=lambda x: x["reward_rules"].get(category, 0.0))
-    rate = best["reward_rules"].get(category, 0.0)
+    best = snapshot["recommendations"][category]
+    rate = best["rate"]
     value = body.amount * rate
 
+    # Purchases default to the recommended card unless the client says which card was used.
+    used = next((c for c in snapshot["cards"] if c["id"] == (body.card_id or best["card_id"])), None)
+    if not used:
+        raise HTTPException(status_code=400, detail="Card not found in wallet")
+    earned = body.amount * used["reward_rules"].get(category, 0.0)
+    conn = get_db()
+    record_transaction(conn, user["sub"], body.merchant, category, body.amount, used["id"], earned, value)
+    conn.commit()
+    conn.close()
+
     return {
         "category": category,
         "confidence": 0.7,
         "recommendedCard": {
-            "id": best["id"],
+            "id": best["card_id"],
             "name": best["card_name"],
             "bank": best["issuer"],
         },
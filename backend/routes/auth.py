@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from auth import hash_password, require_user, sign_jwt, verify_password
 from database import get_db, now_ts
+from queries import USER_BY_EMAIL
 from schemas import RegisterReq
 
 router = APIRouter()
@@ -33,7 +34,7 @@ def register(body: RegisterReq) -> dict[str, Any]:
 @router.post("/api/auth/login")
 def login(body: RegisterReq) -> dict[str, Any]:
     conn = get_db()
-    row = conn.execute("SELECT id, email, password_hash FROM users WHERE email = ?", (body.email.lower().strip(),)).fetchone()
+    row = conn.run(USER_BY_EMAIL, (body.email.lower().strip(),)).fetchone()
     conn.close()
     if not row or not verify_password(body.password, row["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -1,13 +1,28 @@
 import json
+import math
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
+from audit import record_lookup_audit
 from auth import require_user
-from database import get_db, now_ts, row_to_card
-from gemini_service import extract_card_from_web
+from card_search import card_index, find_verified_match
+from catalog_cache import catalog_payload
+from compression import choose_encoding
+from database import get_db, get_read_db, mark_user_write, now_ts, row_to_card
+from gemini_service import GeminiBusyError, extract_card_from_web
+from queries import (
+    CARD_BY_ID,
+    CARD_ID_BY_ID,
+    CARD_ID_BY_NAME_ISSUER,
+    INSERT_USER_CARD,
+    VERIFIED_CARD_BY_NAME_ISSUER,
+)
+from rate_limit import rate_limit
+from resilience import CircuitOpenError
 from schemas import ConfirmReq, LookupReq, WalletReq
+from wallet_snapshot import get_wallet_snapshot, materialize_wallet_snapshot
 
 router = APIRouter()
 
@@ -26,6 +41,8 @@ def extract_unknown_card(req: LookupReq) -> dict[str, Any]:
             "evidence": extracted["evidence"],
             "confidence": extracted["confidence"],
         }
+    except (GeminiBusyError, CircuitOpenError):
+        raise
     except Exception:
         # Fallback for resilience when Gemini is unavailable.
         rules = {
@@ -54,89 +71,109 @@ def extract_unknown_card(req: LookupReq) -> dict[str, Any]:
         }
 
 
+def catalog_response(request: Request, verification: str, cache_control: str, user_id: str | None = None) -> Response:
+    conn = get_read_db(user_id)
+    payload = catalog_payload(conn, verification)
+    conn.close()
+
+    encoding = choose_encoding(request.headers.get("accept-encoding")) or "identity"
+    etag = payload.etag(encoding)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag in (t.strip() for t in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(payload.bodies[encoding], media_type="application/json", headers=headers)
+
+
 @router.get("/api/cards/catalog")
-def list_catalog(verification: str = "verified", user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
-    _ = user
+def list_catalog(request: Request, verification: str = "verified", user: dict[str, Any] = Depends(require_user)) -> Response:
     verification = "pending" if verification == "pending" else "verified"
-    conn = get_db()
-    rows = conn.execute("SELECT * FROM card_catalog WHERE verification_status = ? ORDER BY updated_at DESC", (verification,)).fetchall()
-    conn.close()
-    return {"cards": [row_to_card(r) for r in rows]}
+    return catalog_response(request, verification, "private, no-cache", user["sub"])
 
 
 @router.get("/api/cards/public")
-def list_public_cards() -> dict[str, Any]:
-    conn = get_db()
-    rows = conn.execute(
-        "SELECT * FROM card_catalog WHERE verification_status = 'verified' ORDER BY updated_at DESC"
-    ).fetchall()
-    conn.close()
-    return {"cards": [row_to_card(r) for r in rows]}
+def list_public_cards(request: Request) -> Response:
+    return catalog_response(request, "verified", "public, no-cache")
+
+
+@router.get("/api/cards/search")
+def search_cards(
+    q: str,
+    limit: int = 10,
+    verification: str = "verified",
+    user: dict[str, Any] = Depends(require_user),
+) -> dict[str, Any]:
+    _ = user
+    verification = "pending" if verification == "pending" else "verified"
+    results = card_index().search(q, limit=max(1, min(limit, 25)), verification=verification)
+    return {"cards": [{**card, "score": score} for score, card in results]}
 
 
 @router.get("/api/cards/wallet")
 def list_wallet(user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
-    conn = get_db()
-    rows = conn.execute(
-        """
-        SELECT c.* FROM user_cards u
-        INNER JOIN card_catalog c ON c.id = u.card_catalog_id
-        WHERE u.user_id = ? AND u.is_active = 1
-        ORDER BY u.created_at DESC
-        """,
-        (user["sub"],),
-    ).fetchall()
+    conn = get_read_db(user["sub"])
+    _, snapshot = get_wallet_snapshot(conn, user["sub"])
     conn.close()
-    return {"cards": [row_to_card(r) for r in rows]}
+    return {"cards": snapshot["cards"]}
 
 
 @router.post("/api/cards/wallet")
 def add_wallet(body: WalletReq, user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
     conn = get_db()
     cur = conn.cursor()
-    exists = cur.execute("SELECT id FROM card_catalog WHERE id = ?", (body.card_catalog_id,)).fetchone()
+    exists = cur.run(CARD_ID_BY_ID, (body.card_catalog_id,)).fetchone()
     if not exists:
         conn.close()
         raise HTTPException(status_code=404, detail="Card not found")
-    cur.execute(
-        """
-        INSERT INTO user_cards (id, user_id, card_catalog_id, nickname, last_four, is_active, created_at)
-        VALUES (?, ?, ?, ?, ?, 1, ?)
-        ON CONFLICT(user_id, card_catalog_id) DO NOTHING
-        """,
+    cur.run(
+        INSERT_USER_CARD,
         (str(uuid.uuid4()), user["sub"], body.card_catalog_id, body.nickname, body.last_four, now_ts()),
     )
+    materialize_wallet_snapshot(conn, user["sub"])
     conn.commit()
     conn.close()
+    mark_user_write(user["sub"])
     return {"success": True}
 
 
 @router.post("/api/cards/lookup")
-def lookup(body: LookupReq, user: dict[str, Any] = Depends(require_user)) -> dict[str, Any]:
+def lookup(body: LookupReq, user: dict[str, Any] = Depends(rate_limit("lookup"))) -> dict[str, Any]:
     conn = get_db()
-    row = conn.execute(
-        """
-        SELECT * FROM card_catalog
-        WHERE lower(card_name) = lower(?) AND lower(issuer) = lower(?) AND verification_status = 'verified'
-        LIMIT 1
-        """,
-        (body.card_name.strip(), body.issuer.strip()),
-    ).fetchone()
+    row = conn.run(VERIFIED_CARD_BY_NAME_ISSUER, (body.card_name.strip(), body.issuer.strip())).fetchone()
+    audit_payload = {"card_id": row["id"]} if row else {}
+
+    if not row:
+        # Near-miss spellings resolve from the search index instead of a Gemini extraction.
+        match = find_verified_match(body.card_name, body.issuer)
+        if match:
+            row = conn.run(CARD_BY_ID, (match[0],)).fetchone()
+            audit_payload = {"card_id": match[0], "match_score": match[1]}
 
     if row:
-        conn.execute(
-            "INSERT INTO lookup_audit (id, user_id, query_card_name, query_issuer, status, payload_json, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (str(uuid.uuid4()), user["sub"], body.card_name, body.issuer, "found_verified", json.dumps({"card_id": row["id"]}), now_ts()),
-        )
+        record_lookup_audit(conn, user["sub"], body.card_name, body.issuer, "found_verified", audit_payload)
         conn.commit()
         conn.close()
         return {"status": "found_verified", "card": row_to_card(row)}
 
-    candidate = extract_unknown_card(body)
-    conn.execute(
-        "INSERT INTO lookup_audit (id, user_id, query_card_name, query_issuer, status, payload_json, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-        (str(uuid.uuid4()), user["sub"], body.card_name, body.issuer, "lookup_pending", json.dumps(candidate), now_ts()),
-    )
+    try:
+        candidate = extract_unknown_card(body)
+    except GeminiBusyError:
+        conn.close()
+        raise HTTPException(
+            status_code=429,
+            detail="Card lookup is busy. Please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
+    except CircuitOpenError as error:
+        conn.close()
+        raise HTTPException(
+            status_code=503,
+            detail="Card lookup is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+        )
+    record_lookup_audit(conn, user["sub"], body.card_name, body.issuer, "lookup_pending", candidate)
     conn.commit()
     conn.close()
 
@@ -153,10 +190,7 @@ def confirm(body: ConfirmReq, user: dict[str, Any] = Depends(require_user)) -> d
     conn = get_db()
     cur = conn.cursor()
 
-    row = cur.execute(
-        "SELECT id FROM card_catalog WHERE lower(card_name)=lower(?) AND lower(issuer)=lower(?) LIMIT 1",
-        (body.card_name, body.issuer),
-    ).fetchone()
+    row = cur.run(CARD_ID_BY_NAME_ISSUER, (body.card_name, body.issuer)).fetchone()
 
     if row:
         card_id = row["id"]
@@ -181,21 +215,18 @@ def confirm(body: ConfirmReq, user: dict[str, Any] = Depends(require_user)) -> d
             ),
         )
 
-    cur.execute(
-        """
-        INSERT INTO user_cards (id, user_id, card_catalog_id, nickname, last_four, is_active, created_at)
-        VALUES (?, ?, ?, ?, ?, 1, ?)
-        ON CONFLICT(user_id, card_catalog_id) DO NOTHING
-        """,
+    cur.run(
+        INSERT_USER_CARD,
         (str(uuid.uuid4()), user["sub"], card_id, body.nickname, body.last_four, now_ts()),
     )
 
-    cur.execute(
-        "INSERT INTO lookup_audit (id, user_id, query_card_name, query_issuer, status, payload_json, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-        (str(uuid.uuid4()), user["sub"], body.card_name, body.issuer, "confirmed_pending", json.dumps({"card_id": card_id}), now_ts()),
-    )
+    record_lookup_audit(conn, user["sub"], body.card_name, body.issuer, "confirmed_pending", {"card_id": card_id})
+    materialize_wallet_snapshot(conn, user["sub"])
 
     conn.commit()
-    row = cur.execute("SELECT * FROM card_catalog WHERE id = ?", (card_id,)).fetchone()
+    row = cur.run(CARD_BY_ID, (card_id,)).fetchone()
     conn.close()
-    return {"success": True, "card": row_to_card(row)}
+    mark_user_write(user["sub"])
+    card = row_to_card(row)
+    card_index().upsert(card)
+    return {"success": True, "card": card}
@@ -4,28 +4,21 @@ from typing import Any
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
 
-from auth import require_user
-from database import get_db, row_to_card
+from database import get_read_db
 from gemini_service import generate_chat_reply
+from rate_limit import rate_limit
 from schemas import ChatReq
+from wallet_snapshot import get_wallet_snapshot
 
 router = APIRouter()
 
 
 @router.post("/api/chat")
-def chat(body: ChatReq, user: dict[str, Any] = Depends(require_user)) -> StreamingResponse:
-    conn = get_db()
-    rows = conn.execute(
-        """
-        SELECT c.* FROM user_cards u
-        INNER JOIN card_catalog c ON c.id = u.card_catalog_id
-        WHERE u.user_id = ? AND u.is_active = 1 AND c.verification_status = 'verified'
-        ORDER BY u.created_at DESC
-        """,
-        (user["sub"],),
-    ).fetchall()
+def chat(body: ChatReq, user: dict[str, Any] = Depends(rate_limit("chat"))) -> StreamingResponse:
+    conn = get_read_db(user["sub"])
+    _, snapshot = get_wallet_snapshot(conn, user["sub"])
     conn.close()
-    cards = [row_to_card(r) for r in rows]
+    cards = [c for c in snapshot["cards"] if c["verification_status"] == "verified"]
 
     def event_stream() -> Any:
         try:
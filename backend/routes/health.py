@@ -1,8 +1,13 @@
+from typing import Any
+
 from fastapi import APIRouter
 
+from database import replica_router
+from gemini_service import gemini_breaker
+
 router = APIRouter()
 
 
 @router.get("/api/health")
-def health() -> dict[str, bool]:
-    return {"ok": True}
+def health() -> dict[str, Any]:
+    return {"ok": True, "gemini": gemini_breaker.snapshot(), "db_replicas": replica_router.status()}
@@ -0,0 +1,24 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, Request, Response
+
+from auth import require_user
+from database import get_read_db
+from wallet_snapshot import get_wallet_snapshot, snapshot_etag
+
+router = APIRouter()
+
+
+@router.get("/api/wallet/snapshot")
+def wallet_snapshot(request: Request, response: Response, user: dict[str, Any] = Depends(require_user)) -> Any:
+    conn = get_read_db(user["sub"])
+    version, snapshot = get_wallet_snapshot(conn, user["sub"])
+    conn.close()
+
+    etag = snapshot_etag(version)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return {"version": version, **snapshot}
@@ -0,0 +1,70 @@
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable
+
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+_stop = threading.Event()
+
+# Identifies this process as a lease holder.
+INSTANCE_ID = uuid.uuid4().hex
+
+
+def claim_lease(name: str, seconds: float) -> bool:
+    """Take or renew the named lease in job_leases for seconds; False while another instance holds it."""
+    now = time.time()
+    conn = get_db()
+    try:
+        conn.execute(
+            """
+            INSERT INTO job_leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE job_leases.expires_at < ? OR job_leases.holder = excluded.holder
+            """,
+            (name, INSTANCE_ID, now + seconds, now),
+        )
+        row = conn.execute("SELECT holder FROM job_leases WHERE name = ?", (name,)).fetchone()
+        conn.commit()
+        return row["holder"] == INSTANCE_ID
+    finally:
+        conn.close()
+
+
+def release_lease(name: str) -> None:
+    conn = get_db()
+    try:
+        conn.execute("DELETE FROM job_leases WHERE name = ? AND holder = ?", (name, INSTANCE_ID))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def start_periodic(name: str, interval: float, fn: Callable[[], Any], exclusive: bool = False) -> threading.Thread | None:
+    """Run fn every interval seconds on a daemon thread; interval <= 0 disables the job.
+
+    exclusive jobs run on one instance only: the instance holding the job's lease keeps renewing
+    it each tick, and another takes over once it has lapsed for half an interval.
+    """
+    if interval <= 0:
+        return None
+
+    def loop() -> None:
+        while not _stop.wait(interval):
+            try:
+                if exclusive and not claim_lease(f"periodic:{name}", interval * 1.5):
+                    continue
+                fn()
+            except Exception:
+                logger.exception("Background job %s failed", name)
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_all() -> None:
+    _stop.set()
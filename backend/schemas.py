@@ -43,7 +43,9 @@ class ConfirmReq(BaseModel):
 
 class AnalyzeReq(BaseModel):
     merchant: str
-    amount: float
+    # Stored and summed into reward_rollups, so only real purchase amounts are accepted.
+    amount: float = Field(gt=0, allow_inf_nan=False)
+    card_id: str | None = None
 
 
 class ChatReq(BaseModel):
@@ -0,0 +1,113 @@
+"""Cards refreshed per Gemini call for the batched catalog refresher.
+
+Seeds a temporary SQLite catalog with pending and stale extracted cards,
+half of which already match what the stub will return, then runs
+card_refresher.refresh_cards against the in-process stub once with one card
+per call ("before") and once with batching ("after"). Exits non-zero if
+unchanged cards are rewritten, changed ones are missed, a card's evidence
+lists another card's sources, or a second run re-checks cards inside the
+recheck window.
+
+Usage (from backend/):
+    python scripts/bench_card_refresh.py --cards 200 --batch-size 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gemini_stub import Faults, _rates, _slug, make_server  # noqa: E402
+
+server = make_server(faults=Faults(latency=0.05))
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+os.environ["GEMINI_API_BASE"] = f"http://127.0.0.1:{server.server_address[1]}"
+os.environ["GEMINI_API_KEY"] = "stub"
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="cardsavvy-refresh-"), "bench.db")
+
+import card_refresher  # noqa: E402
+from database import get_db, init_db  # noqa: E402
+
+failures: list[str] = []
+
+
+def seed(count: int) -> int:
+    """Insert extracted cards and return how many carry rates the stub will change."""
+    conn = get_db()
+    conn.execute("DELETE FROM card_catalog WHERE source <> 'manual_verified'")
+    conn.execute("DELETE FROM card_refresh_state")
+    stale = (datetime.now(timezone.utc) - timedelta(days=card_refresher.CARD_REFRESH_STALE_DAYS + 1)).isoformat()
+    drifted = 0
+    for i in range(count):
+        name, issuer = f"Bench Card {i}", f"Bench Bank {i % 7}"
+        rules = _rates(f"{issuer} {name}")
+        if i % 2:
+            rules = {k: round(v + 0.01, 3) for k, v in rules.items()}
+            drifted += 1
+        status = "pending" if i % 3 else "verified"
+        conn.execute(
+            """
+            INSERT INTO card_catalog
+            (id, card_name, issuer, network, reward_rules_json, source, verification_status, evidence_json, created_by_user_id, created_at, updated_at)
+            VALUES (?, ?, ?, 'Visa', ?, 'web_extracted', ?, NULL, NULL, ?, ?)
+            """,
+            (f"bench-{i}", name, issuer, json.dumps(rules), status, stale, stale),
+        )
+    conn.commit()
+    conn.close()
+    return drifted
+
+
+def run(label: str, count: int, batch_size: int) -> None:
+    drifted = seed(count)
+    card_refresher.CARD_REFRESH_BATCH_SIZE = batch_size
+    max_calls = -(-count // batch_size)
+    calls_before = server.stats["requests"]
+    started = time.perf_counter()
+    stats = card_refresher.refresh_cards(max_calls=max_calls)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:<7} batch={batch_size:<3} calls={stats['gemini_calls']:<4} checked={stats['cards_checked']:<4} "
+        f"changed={stats['cards_changed']:<4} cards/call={stats['cards_per_call']:<6} {elapsed:.2f}s"
+    )
+    if server.stats["requests"] - calls_before != stats["gemini_calls"]:
+        failures.append(f"{label}: stub saw {server.stats['requests'] - calls_before} calls, refresher reported {stats['gemini_calls']}")
+    if stats["cards_checked"] != count or stats["cards_changed"] != drifted:
+        failures.append(f"{label}: expected {count} checked / {drifted} changed, got {stats}")
+
+    conn = get_db()
+    rows = conn.execute("SELECT card_name, issuer, evidence_json FROM card_catalog WHERE evidence_json IS NOT NULL").fetchall()
+    conn.close()
+    foreign = [r["card_name"] for r in rows if json.loads(r["evidence_json"])["urls"] != [f"http://127.0.0.1/stub/{_slug(r['issuer'], r['card_name'])}"]]
+    if foreign:
+        failures.append(f"{label}: {len(foreign)} cards store sources that are not their own, e.g. {foreign[0]}")
+
+    again = card_refresher.refresh_cards(max_calls=max_calls)
+    if again["gemini_calls"]:
+        failures.append(f"{label}: second run re-checked cards inside the recheck window: {again}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=card_refresher.CARD_REFRESH_BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    run("before", args.cards, 1)
+    run("after", args.cards, args.batch_size)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark the fuzzy card search index against a synthetic catalog.
+
+Reports index build time, search latency percentiles and how many lookup
+queries the index resolves that the exact name/issuer match would have sent
+to Gemini.
+
+Usage (from backend/):
+    python scripts/bench_card_search.py --entries 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from card_search import LOOKUP_MIN_SCORE, CardSearchIndex  # noqa: E402
+from cards_seed import CURATED_CARDS  # noqa: E402
+
+ISSUERS = ["HDFC", "Axis", "ICICI", "SBI", "Kotak", "Yes", "IDFC First", "AU", "RBL", "IndusInd", "HSBC", "Amex"]
+WORDS = [
+    "Millennia", "Regalia", "Infinia", "Diners", "Flipkart", "Amazon", "Pay", "Magnus", "Atlas", "Ace",
+    "Cashback", "SimplyClick", "Elite", "Prime", "Select", "Wealth", "Zeta", "Rupay", "Platinum", "Signature",
+    "Coral", "Rubyx", "Sapphiro", "Emeralde", "Vistara", "Airtel", "Swiggy", "Tata", "Neu", "Shoppers",
+]
+
+
+def typo(rng: random.Random, text: str) -> str:
+    i = rng.randrange(1, len(text) - 1)
+    op = rng.choice(["drop", "swap", "dup"])
+    if op == "drop":
+        return text[:i] + text[i + 1 :]
+    if op == "swap":
+        return text[: i - 1] + text[i] + text[i - 1] + text[i + 1 :]
+    return text[:i] + text[i] + text[i:]
+
+
+def synthetic_cards(rng: random.Random, entries: int) -> list[dict]:
+    cards = [{**c, "verification_status": "verified"} for c in CURATED_CARDS]
+    seen = {(c["card_name"], c["issuer"]) for c in cards}
+    while len(cards) < entries:
+        issuer = rng.choice(ISSUERS)
+        name = f"{issuer} {' '.join(rng.sample(WORDS, rng.randint(1, 3)))} {rng.randint(1, 999)}"
+        if (name, issuer) in seen:
+            continue
+        seen.add((name, issuer))
+        cards.append(
+            {
+                "id": f"bench-{len(cards)}",
+                "card_name": name,
+                "issuer": issuer,
+                "network": "Visa",
+                "verification_status": "verified" if rng.random() < 0.8 else "pending",
+            }
+        )
+    return cards
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    cards = synthetic_cards(rng, args.entries)
+    exact = {(c["card_name"].lower(), c["issuer"].lower()) for c in cards if c["verification_status"] == "verified"}
+
+    index = CardSearchIndex()
+    started = time.perf_counter()
+    for card in cards:
+        index.upsert(card)
+    print(f"built index over {len(index)} cards in {time.perf_counter() - started:.2f}s")
+
+    verified = [c for c in cards if c["verification_status"] == "verified"]
+    latencies = []
+    exact_misses = 0
+    avoided = 0
+    correct = 0
+    for _ in range(args.queries):
+        card = rng.choice(verified)
+        variant = rng.choice(["typo", "suffix", "lower"])
+        if variant == "typo":
+            name = typo(rng, card["card_name"])
+        elif variant == "suffix":
+            name = f"{card['card_name']} Credit Card"
+        else:
+            name = card["card_name"].lower()
+
+        started = time.perf_counter()
+        results = index.search(f"{card['issuer']} {name}", limit=1, verification="verified", prefix=False)
+        latencies.append(time.perf_counter() - started)
+
+        if (name.lower(), card["issuer"].lower()) in exact:
+            continue
+        exact_misses += 1
+        if results and results[0][0] >= LOOKUP_MIN_SCORE:
+            avoided += 1
+            correct += results[0][1]["id"] == card["id"]
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"search latency p50={p50:.3f}ms p99={p99:.3f}ms over {len(latencies)} queries")
+    print(f"exact match misses (Gemini calls before): {exact_misses}")
+    print(f"resolved by index (Gemini calls avoided): {avoided} ({correct} to the intended card)")
+
+
+if __name__ == "__main__":
+    main()
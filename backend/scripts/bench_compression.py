@@ -0,0 +1,123 @@
+"""Bytes on the wire and CPU per request for the catalog endpoints.
+
+Seeds a temporary SQLite catalog with verified cards carrying evidence URLs
+and notes, then serves the catalog three ways:
+
+    identity     serialize on every request, no compression (the old handler)
+    dynamic      serialize on every request, compressed by CompressionMiddleware
+    precomputed  catalog_cache.catalog_payload, bodies built once per version
+
+CPU is process time per request, including the catalog version query.
+
+Usage (from backend/):
+    python scripts/bench_compression.py --cards 500 --requests 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="cardsavvy-compress-"), "bench.db")
+
+from catalog_cache import catalog_payload  # noqa: E402
+from compression import CompressionMiddleware, available_encodings, choose_encoding  # noqa: E402
+from database import get_db, init_db, now_ts, row_to_card  # noqa: E402
+from gemini_service import CATEGORY_KEYS  # noqa: E402
+from queries import CATALOG_BY_STATUS  # noqa: E402
+
+
+def seed(count: int) -> None:
+    conn = get_db()
+    for i in range(count):
+        evidence = {
+            "urls": [f"https://bank{i % 9}.example.com/cards/bench-card-{i}/rewards", f"https://reviews.example.com/bench-card-{i}"],
+            "notes": f"Bench card {i} earns accelerated rewards on partner merchants; base rate applies elsewhere.",
+        }
+        conn.execute(
+            """
+            INSERT INTO card_catalog
+            (id, card_name, issuer, network, reward_rules_json, source, verification_status, evidence_json, created_by_user_id, created_at, updated_at)
+            VALUES (?, ?, ?, 'Visa', ?, 'web_extracted', 'verified', ?, NULL, ?, ?)
+            """,
+            (
+                f"bench-{i}",
+                f"Bench Card {i}",
+                f"Bench Bank {i % 9}",
+                json.dumps({k: round(0.005 + (i * 7 + j) % 50 / 1000, 3) for j, k in enumerate(CATEGORY_KEYS)}),
+                json.dumps(evidence),
+                now_ts(),
+                now_ts(),
+            ),
+        )
+    conn.commit()
+    conn.close()
+
+
+def serialize() -> bytes:
+    conn = get_db()
+    rows = conn.run(CATALOG_BY_STATUS, ("verified",)).fetchall()
+    conn.close()
+    return json.dumps({"cards": [row_to_card(r) for r in rows]}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dynamic(accept: str) -> bytes:
+    async def app(scope, receive, send):
+        body = serialize()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    sent: list[bytes] = []
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sent.append(message["body"])
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept.encode())]}
+    asyncio.run(CompressionMiddleware(app)(scope, None, send))
+    return b"".join(sent)
+
+
+def precomputed(accept: str) -> bytes:
+    conn = get_db()
+    payload = catalog_payload(conn, "verified")
+    conn.close()
+    return payload.bodies[choose_encoding(accept) or "identity"]
+
+
+def measure(fn, requests: int) -> tuple[int, float]:
+    body = fn()
+    started = time.process_time()
+    for _ in range(requests):
+        fn()
+    return len(body), (time.process_time() - started) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    init_db()
+    seed(args.cards)
+
+    cases = [("identity", "-", serialize)]
+    for encoding in available_encodings():
+        cases.append(("dynamic", encoding, lambda e=encoding: dynamic(e)))
+        cases.append(("precomputed", encoding, lambda e=encoding: precomputed(e)))
+
+    print(f"cards={args.cards} requests={args.requests}")
+    print(f"{'mode':<12} {'encoding':<9} {'bytes':>9} {'cpu us/req':>11}")
+    for mode, encoding, fn in cases:
+        size, cpu_us = measure(fn, args.requests)
+        print(f"{mode:<12} {encoding:<9} {size:>9} {cpu_us:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Exercise the Gemini retry/breaker/hedging layer against the fault-injecting stub.
+
+Runs in-process against scripts/gemini_stub.py and exits non-zero if a
+scenario does not behave as expected.
+
+Usage (from backend/):
+    python scripts/bench_gemini_resilience.py
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gemini_stub import Faults, make_server  # noqa: E402
+
+server = make_server(faults=Faults())
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+os.environ["GEMINI_API_BASE"] = f"http://127.0.0.1:{server.server_address[1]}"
+os.environ["GEMINI_API_KEY"] = "stub"
+os.environ.setdefault("GEMINI_BREAKER_FAILURES", "5")
+os.environ.setdefault("GEMINI_BREAKER_RESET_SECONDS", "1")
+os.environ.setdefault("GEMINI_HEDGE_DELAY_SECONDS", "0.15")
+os.environ.setdefault("GEMINI_DEADLINE_SECONDS", "5")
+
+import gemini_service  # noqa: E402
+from resilience import CircuitOpenError  # noqa: E402
+
+failures: list[str] = []
+
+
+def run(calls: int, hedge: bool = False) -> tuple[int, list[float], int]:
+    ok = 0
+    fast_fail = 0
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        try:
+            gemini_service._call_gemini("hello", hedge=hedge)
+            ok += 1
+        except CircuitOpenError:
+            fast_fail += 1
+        except Exception:
+            pass
+        latencies.append(time.perf_counter() - started)
+    return ok, latencies, fast_fail
+
+
+def percentile(values: list[float], q: float) -> float:
+    return sorted(values)[int(len(values) * q) - 1] * 1000
+
+
+def check(name: str, condition: bool) -> None:
+    print(f"  {'ok  ' if condition else 'FAIL'} {name}")
+    if not condition:
+        failures.append(name)
+
+
+print("healthy upstream")
+ok, lat, _ = run(50)
+check(f"50/50 succeed (got {ok})", ok == 50)
+
+print("30% injected 503s")
+server.faults.error_rate = 0.3
+ok, lat, _ = run(200)
+check(f">= 190/200 succeed with retries (got {ok})", ok >= 190)
+
+print("full outage")
+server.faults.error_rate = 1.0
+before = server.stats["requests"]
+ok, lat, fast_fail = run(50)
+sent = server.stats["requests"] - before
+check(f"breaker opens and sheds calls (upstream saw {sent} of up to 150 attempts)", fast_fail > 40 and sent < 20)
+check(f"open-circuit failures are fast (median {statistics.median(lat) * 1000:.2f}ms)", statistics.median(lat) < 0.01)
+print(f"  breaker: {gemini_service.gemini_breaker.snapshot()}")
+
+print("recovery")
+server.faults.error_rate = 0.0
+time.sleep(gemini_service.gemini_breaker.reset_timeout + 0.1)
+ok, lat, _ = run(20)
+check(f"half-open probe closes breaker (got {ok}/20)", ok == 20)
+check("breaker closed", gemini_service.gemini_breaker.snapshot()["state"] == "closed")
+
+print("10% slow responses (2s)")
+server.faults.slow_rate = 0.1
+server.faults.slow_seconds = 2.0
+_, plain, _ = run(200, hedge=False)
+_, hedged, _ = run(200, hedge=True)
+for q in (0.95, 0.99):
+    print(f"  p{q * 100:.0f} without hedging {percentile(plain, q):.0f}ms, with hedging {percentile(hedged, q):.0f}ms")
+check("hedging cuts p95 latency", percentile(hedged, 0.95) < percentile(plain, 0.95))
+
+server.shutdown()
+sys.exit(1 if failures else 0)
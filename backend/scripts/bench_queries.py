@@ -0,0 +1,102 @@
+"""Per-request query overhead of ad hoc SQL text vs. registered (prepared) queries.
+
+Each iteration does what a request does: take a connection, run one hot
+statement, fetch the rows and give the connection back.
+
+"before" is the old path: a fresh connection per request, the SQL text
+rewritten for the driver on every call and, on PostgreSQL, parsed and planned
+each time with dict rows. "after" is get_db() plus DatabaseConnection.run: on
+PostgreSQL the connection comes from the pool with its prepared statements and
+rows use the keyed row factory. SQLite has no server-side plans and its
+connections are not pooled, so expect the two columns to be close there; the
+gain is on PostgreSQL.
+
+Usage (from backend/):
+    DB_PATH=/tmp/cardsavvy-bench.db python scripts/bench_queries.py
+    DB_PATH=postgresql://localhost/cardsavvy python scripts/bench_queries.py
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+from database import DatabaseConnection, get_db, init_db, row_to_card  # noqa: E402
+from queries import CARD_BY_ID, CATALOG_BY_STATUS, VERIFIED_CARD_BY_NAME_ISSUER, WALLET_CARDS  # noqa: E402
+
+
+def legacy_connection() -> DatabaseConnection:
+    db_path = os.getenv("DB_PATH", database.DB_PATH)
+    if db_path.startswith("postgres://") or db_path.startswith("postgresql://"):
+        from psycopg.rows import dict_row
+
+        return DatabaseConnection("postgres", database.psycopg.connect(db_path, row_factory=dict_row))
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    return DatabaseConnection("sqlite", conn)
+
+
+def legacy_execute(conn: DatabaseConnection, sql: str, params: tuple) -> list:
+    if conn.driver == "postgres":
+        sql = sql.replace("?", "%s")
+    conn.cur.execute(sql, params)
+    return conn.cur.fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    init_db()
+    conn = get_db()
+    conn.execute(
+        "INSERT INTO user_cards (id, user_id, card_catalog_id, is_active, created_at) VALUES (?, ?, ?, 1, ?) ON CONFLICT(user_id, card_catalog_id) DO NOTHING",
+        ("bench-user-card", "bench-user", "seed-hdfc-millennia", database.now_ts()),
+    )
+    conn.commit()
+    conn.close()
+
+    cases = [
+        (CATALOG_BY_STATUS, ("verified",)),
+        (WALLET_CARDS, ("bench-user",)),
+        (VERIFIED_CARD_BY_NAME_ISSUER, ("HDFC Millennia", "HDFC")),
+        (CARD_BY_ID, ("seed-axis-flipkart",)),
+    ]
+
+    def before(query, params):
+        conn = legacy_connection()
+        rows = legacy_execute(conn, query.sqlite, params)
+        conn.close()
+        return rows
+
+    def after(query, params):
+        conn = get_db()
+        rows = conn.run(query, params).fetchall()
+        conn.close()
+        return rows
+
+    print(f"driver={get_db().driver} iterations={args.iterations}")
+    print(f"{'query':<32} {'before us':>10} {'after us':>10} {'decode before':>14} {'decode after':>13}")
+    for query, params in cases:
+        timings = []
+        for run in (before, after):
+            run(query, params)
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                rows = run(query, params)
+            query_us = (time.perf_counter() - started) / args.iterations * 1e6
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                for row in rows:
+                    row_to_card(row)
+            timings.append((query_us, (time.perf_counter() - started) / args.iterations * 1e6))
+        print(f"{query.name:<32} {timings[0][0]:>10.1f} {timings[1][0]:>10.1f} {timings[0][1]:>14.1f} {timings[1][1]:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Generate synthetic transaction history and time the reward analytics query.
+
+Usage (from backend/):
+    DB_PATH=/tmp/cardsavvy-bench.db python scripts/bench_transactions.py --rows 1000000 --users 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import CATEGORIES, get_db, init_db  # noqa: E402
+from transactions import record_transaction, reward_summary  # noqa: E402
+
+MERCHANTS = ["swiggy", "zomato", "amazon", "flipkart", "dmart", "bigbasket", "irctc", "hpcl", "bescom", "pvr"]
+CARD_IDS = ["seed-hdfc-millennia", "seed-axis-flipkart", "seed-icici-amazon-pay"]
+
+
+def generate(users: list[str], rows: int, batch: int, months: list[str]) -> float:
+    conn = get_db()
+    rng = random.Random(42)
+    started = time.perf_counter()
+    for i in range(rows):
+        amount = round(rng.uniform(50, 5000), 2)
+        best = amount * 0.05
+        earned = best if rng.random() < 0.6 else amount * 0.01
+        month = rng.choice(months)
+        created_at = f"{month}-{rng.randint(1, 28):02d}T12:00:00+00:00"
+        record_transaction(
+            conn,
+            rng.choice(users),
+            rng.choice(MERCHANTS),
+            rng.choice(CATEGORIES),
+            amount,
+            rng.choice(CARD_IDS),
+            earned,
+            best,
+            created_at=created_at,
+        )
+        if (i + 1) % batch == 0:
+            conn.commit()
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - started
+
+
+def time_summary(user_id: str, month: str, runs: int) -> float:
+    conn = get_db()
+    started = time.perf_counter()
+    for _ in range(runs):
+        reward_summary(conn, user_id, month)
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed / runs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=4, help="measure query latency after each step")
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    init_db()
+    users = [f"bench-user-{i}" for i in range(args.users)]
+    months = [f"2026-{m:02d}" for m in range(1, 13)]
+    per_step = args.rows // args.steps
+
+    print(f"{'rows':>10} {'insert rows/s':>14} {'summary ms':>11}")
+    total = 0
+    for _ in range(args.steps):
+        elapsed = generate(users, per_step, args.batch, months)
+        total += per_step
+        latency = time_summary(users[0], months[0], args.runs)
+        print(f"{total:>10} {per_step / elapsed:>14.0f} {latency * 1000:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
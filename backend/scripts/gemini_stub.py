@@ -0,0 +1,148 @@
+"""Local stand-in for the Gemini generateContent API with fault injection.
+
+Point the backend at it with GEMINI_API_BASE=http://127.0.0.1:8765 (any
+GEMINI_API_KEY works). Extraction prompts, single-card or batched, get
+deterministic reward JSON back, everything else gets a short chat answer.
+
+Usage (from backend/):
+    python scripts/gemini_stub.py --port 8765 --error-rate 0.2 --slow-rate 0.05 --slow-seconds 5
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+CATEGORY_KEYS = ["dining", "groceries", "shopping", "travel", "fuel", "utilities", "entertainment", "others"]
+
+
+@dataclass
+class Faults:
+    latency: float = 0.0
+    error_rate: float = 0.0
+    error_code: int = 503
+    slow_rate: float = 0.0
+    slow_seconds: float = 5.0
+    seed: int | None = None
+
+
+def _rates(seed: str) -> dict[str, float]:
+    digest = hashlib.sha256(seed.lower().encode()).digest()
+    return {key: round(0.005 + (digest[i] % 50) / 1000, 3) for i, key in enumerate(CATEGORY_KEYS)}
+
+
+def _slug(*parts: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", " ".join(parts).lower()).strip("-")
+
+
+def _field(prompt: str, name: str) -> str:
+    match = re.search(rf"^{name}: (.*)$", prompt, flags=re.MULTILINE)
+    return match.group(1).strip() if match else ""
+
+
+def _answer(prompt: str) -> str:
+    if "Required JSON shape" not in prompt:
+        return "Use the card with the highest rate for this category."
+    batch = re.search(r"^CARDS_JSON: (.*)$", prompt, flags=re.MULTILINE)
+    if batch:
+        return json.dumps(
+            [
+                {
+                    "ref": card["ref"],
+                    "reward_rules": _rates(f"{card['issuer']} {card['card_name']}"),
+                    "confidence": 0.8,
+                    "sources": [f"http://127.0.0.1/stub/{_slug(card['issuer'], card['card_name'])}"],
+                    "notes": "Generated by the local Gemini stub.",
+                }
+                for card in json.loads(batch.group(1))
+            ]
+        )
+    card_name = _field(prompt, "card_name")
+    issuer = _field(prompt, "issuer")
+    return json.dumps(
+        {
+            "card_name": card_name,
+            "issuer": issuer,
+            "network": _field(prompt, "network") or "Visa",
+            "reward_rules": _rates(f"{issuer} {card_name}"),
+            "confidence": 0.8,
+            "notes": "Generated by the local Gemini stub.",
+        }
+    )
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, faults: Faults | None = None) -> ThreadingHTTPServer:
+    faults = faults or Faults()
+    rng = random.Random(faults.seed)
+    stats = {"requests": 0, "errors": 0, "slow": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+            with lock:
+                stats["requests"] += 1
+                roll = rng.random()
+                slow = rng.random() < faults.slow_rate
+                stats["errors"] += roll < faults.error_rate
+                stats["slow"] += slow
+
+            time.sleep(faults.latency + (faults.slow_seconds if slow else 0.0))
+            if roll < faults.error_rate:
+                self.send_response(faults.error_code)
+                self.end_headers()
+                self.wfile.write(b'{"error": "injected fault"}')
+                return
+
+            prompt = body["contents"][0]["parts"][0]["text"]
+            payload = {
+                "candidates": [
+                    {
+                        "content": {"parts": [{"text": _answer(prompt)}]},
+                        "groundingMetadata": {"groundingChunks": [{"web": {"uri": "http://127.0.0.1/stub"}}]},
+                    }
+                ]
+            }
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.faults = faults  # type: ignore[attr-defined]
+    server.stats = stats  # type: ignore[attr-defined]
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-code", type=int, default=503)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    faults = Faults(args.latency, args.error_rate, args.error_code, args.slow_rate, args.slow_seconds, args.seed)
+    server = make_server(args.host, args.port, faults)
+    print(f"Gemini stub listening on http://{args.host}:{server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
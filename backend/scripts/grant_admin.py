@@ -0,0 +1,48 @@
+"""Grant or revoke admin access (/api/admin/*) for an existing user.
+
+Admin rights are bound to the user id, so check the printed account is the
+one you expect before granting.
+
+Usage (from backend/):
+    python scripts/grant_admin.py ops@example.com
+    python scripts/grant_admin.py ops@example.com --revoke
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db, init_db, now_ts  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("email")
+    parser.add_argument("--revoke", action="store_true")
+    args = parser.parse_args()
+
+    init_db()
+    conn = get_db()
+    user = conn.execute(
+        "SELECT id, email, created_at FROM users WHERE email = ?", (args.email.lower().strip(),)
+    ).fetchone()
+    if not user:
+        conn.close()
+        sys.exit(f"No user registered with {args.email}")
+
+    if args.revoke:
+        conn.execute("DELETE FROM admin_users WHERE user_id = ?", (user["id"],))
+    else:
+        conn.execute(
+            "INSERT INTO admin_users (user_id, granted_at) VALUES (?, ?) ON CONFLICT(user_id) DO NOTHING",
+            (user["id"], now_ts()),
+        )
+    conn.commit()
+    conn.close()
+    print(f"{'revoked' if args.revoke else 'granted'} admin: {user['email']} id={user['id']} registered={user['created_at']}")
+
+
+if __name__ == "__main__":
+    main()
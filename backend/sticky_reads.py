@@ -0,0 +1,69 @@
+import hashlib
+import hmac
+import math
+from http.cookies import SimpleCookie
+from typing import Any
+
+from auth import JWT_SECRET
+from database import DB_STICKY_SECONDS, WriteMarks, write_marks
+
+STICKY_COOKIE = "cs_last_write"
+
+
+def _sign(value: str) -> str:
+    return hmac.new(JWT_SECRET.encode(), value.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def encode_marks(marks: WriteMarks) -> str:
+    value = f"{marks.user_id}.{int(marks.written_at * 1000)}"
+    return f"{value}.{_sign(value)}"
+
+
+def decode_marks(cookie: str) -> WriteMarks:
+    value, _, signature = cookie.rpartition(".")
+    user_id, _, written_at = value.rpartition(".")
+    if not user_id or not hmac.compare_digest(signature, _sign(value)):
+        return WriteMarks()
+    try:
+        return WriteMarks(user_id, int(written_at) / 1000)
+    except ValueError:
+        return WriteMarks()
+
+
+class StickyReadsMiddleware:
+    """Keeps read-your-writes across workers and instances.
+
+    A write stamps a short-lived signed cookie with the user and time; any worker that sees it
+    routes that user's reads to the primary for the rest of DB_STICKY_SECONDS.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or DB_STICKY_SECONDS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        marks = WriteMarks()
+        for key, value in scope["headers"]:
+            if key == b"cookie":
+                morsel = SimpleCookie(value.decode("latin-1")).get(STICKY_COOKIE)
+                if morsel is not None:
+                    marks = decode_marks(morsel.value)
+                break
+        token = write_marks.set(marks)
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and marks.wrote:
+                cookie = (
+                    f"{STICKY_COOKIE}={encode_marks(marks)}; Max-Age={math.ceil(DB_STICKY_SECONDS)}; "
+                    "Path=/api; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            write_marks.reset(token)
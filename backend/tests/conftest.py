@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "scripts"))
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """A fresh SQLite database with the app schema and curated cards; yields its path."""
+    from database import init_db
+
+    path = str(tmp_path / "test.db")
+    monkeypatch.setenv("DB_PATH", path)
+    init_db()
+    return path
+
+
+@pytest.fixture
+def client(sqlite_db, monkeypatch):
+    """TestClient over the app with fresh rate limit buckets, catalog cache and search index; startup jobs are not run."""
+    from fastapi.testclient import TestClient
+
+    import audit
+    import card_search
+    import catalog_cache
+    import rate_limit
+    from main import app
+
+    monkeypatch.setattr(audit, "_known_partitions", set())
+    audit.init_audit_storage()
+    monkeypatch.setattr(rate_limit, "_store", rate_limit.MemoryBucketStore())
+    monkeypatch.setattr(catalog_cache, "_payloads", {})
+    monkeypatch.setattr(card_search, "_index", card_search.CardSearchIndex())
+    monkeypatch.setattr(card_search, "_synced_at", 0.0)
+    monkeypatch.setattr(card_search, "_synced_until", "")
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers():
+    """Build an Authorization header for a user id."""
+    import time
+
+    from auth import sign_jwt
+
+    def make(user_id: str) -> dict[str, str]:
+        token = sign_jwt({"sub": user_id, "email": f"{user_id}@example.com", "exp": int(time.time()) + 3600})
+        return {"Authorization": f"Bearer {token}"}
+
+    return make
@@ -0,0 +1,172 @@
+import gzip
+import json
+import os
+import urllib.parse
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+import audit
+from database import get_db, init_db
+
+# A PostgreSQL server URL whose role may create databases, e.g. postgresql://postgres@localhost/postgres.
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL", "")
+
+LEGACY_DDL = """
+CREATE TABLE lookup_audit (
+  id TEXT PRIMARY KEY,
+  user_id TEXT NOT NULL,
+  query_card_name TEXT NOT NULL,
+  query_issuer TEXT,
+  status TEXT NOT NULL,
+  payload_json TEXT,
+  created_at TEXT NOT NULL
+)
+"""
+
+
+@pytest.fixture
+def postgres_db(monkeypatch):
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    import psycopg
+
+    name = f"cardsavvy_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(TEST_POSTGRES_URL, autocommit=True) as admin:
+        admin.execute(f"CREATE DATABASE {name}")
+    monkeypatch.setenv("DB_PATH", urllib.parse.urlsplit(TEST_POSTGRES_URL)._replace(path=f"/{name}").geturl())
+    monkeypatch.setattr(audit, "_known_partitions", set())
+    yield psycopg, name
+    with psycopg.connect(TEST_POSTGRES_URL, autocommit=True) as admin:
+        admin.execute(f"DROP DATABASE {name} WITH (FORCE)")
+
+
+def seed_legacy(rows: int) -> None:
+    conn = get_db()
+    conn.execute(LEGACY_DDL)
+    conn.conn.execute(
+        """
+        INSERT INTO lookup_audit
+        SELECT md5(i::text), 'u' || (i % 10), 'card', 'bank', 'found_verified', NULL,
+               to_char(now() - (i || ' minutes')::interval, 'YYYY-MM-DD"T"HH24:MI:SS.US+00:00')
+        FROM generate_series(1, {rows}) i
+        """.format(rows=int(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_existing_postgres_table_becomes_legacy_partition(postgres_db):
+    seed_legacy(5000)
+    init_db()
+    audit.init_audit_storage()
+    audit.init_audit_storage()
+
+    conn = get_db()
+    audit.record_lookup_audit(conn, "u1", "new card", "bank", "lookup_pending", {"ok": True})
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) AS n FROM lookup_audit").fetchone()["n"] == 5001
+    assert len(audit.query_audit(conn, "u1", "2000", "3000", 10000)) == 501
+    key = conn.execute(
+        "SELECT pg_get_constraintdef(oid) AS def FROM pg_constraint WHERE conrelid = to_regclass('lookup_audit_legacy') AND contype = 'p'"
+    ).fetchone()
+    assert key["def"] == "PRIMARY KEY (id, created_at)"
+    conn.close()
+
+
+MIGRATED_AT = "2026-03-15T12:00:00+00:00"
+
+
+@pytest.fixture
+def sqlite_audit(sqlite_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(audit, "_known_partitions", set())
+    monkeypatch.setattr(audit, "AUDIT_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(audit, "now_ts", lambda: MIGRATED_AT)
+    conn = get_db()
+    conn.execute(LEGACY_DDL)
+    for i in range(5):
+        conn.execute(
+            f"INSERT INTO lookup_audit ({audit.AUDIT_COLUMNS}) VALUES (?, 'u1', 'card', 'bank', 'found_verified', NULL, ?)",
+            (f"legacy-{i}", f"2026-03-0{i + 1}T00:00:00+00:00"),
+        )
+    conn.commit()
+    conn.close()
+    audit.init_audit_storage()
+    return monkeypatch
+
+
+def record_at(monkeypatch, ts: str, user_id: str = "u1") -> None:
+    monkeypatch.setattr(audit, "now_ts", lambda: ts)
+    conn = get_db()
+    audit.record_lookup_audit(conn, user_id, "card", "bank", "lookup_pending", {"at": ts})
+    conn.commit()
+    conn.close()
+
+
+def partitions() -> dict[str, tuple[str, str]]:
+    conn = get_db()
+    rows = conn.execute("SELECT name, range_start, range_end FROM audit_partitions").fetchall()
+    conn.close()
+    return {r["name"]: (r["range_start"], r["range_end"]) for r in rows}
+
+
+def test_sqlite_legacy_table_is_kept_and_restart_is_idempotent(sqlite_audit):
+    expected = {
+        "lookup_audit_legacy": ("", MIGRATED_AT),
+        "lookup_audit_2026_03": (MIGRATED_AT, "2026-04"),
+        "lookup_audit_2026_04": ("2026-04", "2026-05"),
+    }
+    assert partitions() == expected
+
+    audit._known_partitions.clear()
+    audit.init_audit_storage()
+    assert partitions() == expected
+    conn = get_db()
+    assert audit._table_kind(conn, "lookup_audit") is None
+    assert len(audit.query_audit(conn, "u1", "2026-01", "2026-12")) == 5
+    conn.close()
+
+
+def test_sqlite_inserts_route_to_partitions_and_queries_merge(sqlite_audit):
+    record_at(sqlite_audit, "2026-03-20T08:00:00+00:00")
+    record_at(sqlite_audit, "2026-04-10T08:00:00+00:00")
+    record_at(sqlite_audit, "2026-04-11T08:00:00+00:00", user_id="u2")
+
+    conn = get_db()
+    assert conn.execute("SELECT COUNT(*) AS n FROM lookup_audit_2026_03").fetchone()["n"] == 1
+    assert conn.execute("SELECT COUNT(*) AS n FROM lookup_audit_2026_04").fetchone()["n"] == 2
+
+    rows = audit.query_audit(conn, "u1", "2026-03-01", "2026-05")
+    assert [r["created_at"][:10] for r in rows] == [
+        "2026-04-10", "2026-03-20", "2026-03-05", "2026-03-04", "2026-03-03", "2026-03-02", "2026-03-01",
+    ]
+    assert rows[0]["payload"] == {"at": "2026-04-10T08:00:00+00:00"}
+    assert [r["created_at"][:10] for r in audit.query_audit(conn, "u1", "2026-03-02", "2026-03-21", limit=3)] == [
+        "2026-03-20", "2026-03-05", "2026-03-04",
+    ]
+    assert audit.query_audit(conn, "u1", "2026-04-11", "2026-05") == []
+    conn.close()
+
+
+def test_sqlite_archive_then_drop(sqlite_audit):
+    record_at(sqlite_audit, "2026-03-20T08:00:00+00:00")
+    record_at(sqlite_audit, "2026-04-10T08:00:00+00:00")
+
+    # Retention is 90 days: on 2026-07-20 everything ending before 2026-04-21 expires.
+    archived = audit.archive_expired_partitions(now=datetime(2026, 7, 20, tzinfo=timezone.utc))
+    assert archived == ["lookup_audit_legacy", "lookup_audit_2026_03"]
+    assert set(partitions()) == {"lookup_audit_2026_04", "lookup_audit_2026_08"}
+
+    with gzip.open(os.path.join(audit.AUDIT_ARCHIVE_DIR, "lookup_audit_legacy.ndjson.gz")) as f:
+        legacy = [json.loads(line) for line in f]
+    assert [r["id"] for r in legacy] == [f"legacy-{i}" for i in range(5)]
+    with gzip.open(os.path.join(audit.AUDIT_ARCHIVE_DIR, "lookup_audit_2026_03.ndjson.gz")) as f:
+        assert [json.loads(line)["created_at"] for line in f] == ["2026-03-20T08:00:00+00:00"]
+
+    conn = get_db()
+    assert audit._table_kind(conn, "lookup_audit_legacy") is None
+    assert audit._table_kind(conn, "lookup_audit_2026_03") is None
+    assert [r["created_at"][:10] for r in audit.query_audit(conn, "u1", "2026-01", "2026-12")] == ["2026-04-10"]
+    conn.close()
+    assert audit.archive_expired_partitions(now=datetime(2026, 7, 20, tzinfo=timezone.utc)) == []
@@ -0,0 +1,138 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import card_refresher
+import gemini_service
+import scheduler
+from database import get_db, now_ts
+from gemini_stub import Faults, _rates, _slug, make_server
+from resilience import CircuitBreaker
+from wallet_snapshot import get_wallet_snapshot, materialize_wallet_snapshot
+
+STALE = (datetime.now(timezone.utc) - timedelta(days=card_refresher.CARD_REFRESH_STALE_DAYS + 1)).isoformat()
+
+
+@pytest.fixture
+def stub(sqlite_db, monkeypatch):
+    server = make_server(faults=Faults(seed=7))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("GEMINI_API_BASE", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setenv("GEMINI_API_KEY", "stub")
+    monkeypatch.setattr(gemini_service, "gemini_breaker", CircuitBreaker("gemini", failure_threshold=5, reset_timeout=0.5))
+    monkeypatch.setattr(card_refresher, "CARD_REFRESH_BATCH_SIZE", 5)
+    yield server
+    server.shutdown()
+
+
+def seed(count: int) -> list[str]:
+    """Insert stale extracted cards, every other one with rates the stub will change; return those ids."""
+    conn = get_db()
+    drifted = []
+    for i in range(count):
+        name, issuer = f"Test Card {i}", "Test Bank"
+        rules = _rates(f"{issuer} {name}")
+        if i % 2:
+            rules = {k: round(v + 0.01, 3) for k, v in rules.items()}
+            drifted.append(f"card-{i}")
+        conn.execute(
+            """
+            INSERT INTO card_catalog
+            (id, card_name, issuer, network, reward_rules_json, source, verification_status, evidence_json, created_by_user_id, created_at, updated_at)
+            VALUES (?, ?, ?, 'Visa', ?, 'web_extracted', ?, NULL, NULL, ?, ?)
+            """,
+            (f"card-{i}", name, issuer, json.dumps(rules), "pending" if i % 3 else "verified", STALE, STALE),
+        )
+    conn.commit()
+    conn.close()
+    return drifted
+
+
+def catalog() -> dict[str, dict]:
+    conn = get_db()
+    rows = conn.execute("SELECT * FROM card_catalog WHERE source = 'web_extracted'").fetchall()
+    conn.close()
+    return {r["id"]: dict(zip(r.keys(), r)) for r in rows}
+
+
+def test_batches_cards_and_stores_only_changes(stub):
+    drifted = seed(12)
+    stats = card_refresher.refresh_cards(max_calls=10)
+
+    assert stats["gemini_calls"] == stub.stats["requests"] == 3
+    assert stats["cards_checked"] == 12
+    assert stats["cards_changed"] == len(drifted)
+    rows = catalog()
+    for card_id, row in rows.items():
+        if card_id in drifted:
+            assert row["updated_at"] != STALE
+            assert json.loads(row["reward_rules_json"]) == _rates(f"Test Bank {row['card_name']}")
+            assert json.loads(row["evidence_json"])["urls"] == [f"http://127.0.0.1/stub/{_slug('Test Bank', row['card_name'])}"]
+        else:
+            assert row["updated_at"] == STALE
+            assert row["evidence_json"] is None
+
+
+def test_unchanged_stale_card_waits_until_stale_again(stub):
+    seed(2)
+    card_refresher.refresh_cards(max_calls=10)
+    now = datetime.now(timezone.utc)
+
+    # Past the recheck window: the pending card is checked again, the verified unchanged one is not.
+    stats = card_refresher.refresh_cards(max_calls=10, now=now + timedelta(days=2))
+    assert stats["cards_checked"] == 1
+
+    stats = card_refresher.refresh_cards(max_calls=10, now=now + timedelta(days=card_refresher.CARD_REFRESH_STALE_DAYS + 1))
+    assert stats["cards_checked"] == 2
+
+
+def test_stops_while_circuit_is_open(stub, monkeypatch):
+    seed(10)
+    breaker = CircuitBreaker("gemini", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    monkeypatch.setattr(gemini_service, "gemini_breaker", breaker)
+
+    stats = card_refresher.refresh_cards(max_calls=10)
+    assert stats["stopped"] == "circuit_open"
+    assert stats["gemini_calls"] == stats["cards_checked"] == stub.stats["requests"] == 0
+    conn = get_db()
+    assert conn.execute("SELECT COUNT(*) AS n FROM card_refresh_state").fetchone()["n"] == 0
+    conn.close()
+
+
+def test_rebuilds_snapshots_of_card_holders(stub):
+    seed(2)
+    conn = get_db()
+    conn.execute(
+        "INSERT INTO user_cards (id, user_id, card_catalog_id, nickname, last_four, is_active, created_at) VALUES ('uc', 'u1', 'card-1', NULL, NULL, 1, ?)",
+        (now_ts(),),
+    )
+    version, _ = materialize_wallet_snapshot(conn, "u1")
+    conn.commit()
+
+    card_refresher.refresh_cards(max_calls=10)
+
+    new_version, snapshot = get_wallet_snapshot(conn, "u1")
+    conn.close()
+    assert new_version == version + 1
+    assert snapshot["cards"][0]["reward_rules"] == _rates("Test Bank Test Card 1")
+
+
+def test_one_instance_refreshes_at_a_time(stub, monkeypatch):
+    seed(2)
+    instance_id = scheduler.INSTANCE_ID
+    monkeypatch.setattr(scheduler, "INSTANCE_ID", "other-instance")
+    assert scheduler.claim_lease(card_refresher.CARD_REFRESH_LEASE, 60)
+    monkeypatch.setattr(scheduler, "INSTANCE_ID", instance_id)
+
+    with pytest.raises(RuntimeError):
+        card_refresher.refresh_cards(max_calls=10)
+    assert stub.stats["requests"] == 0
+
+    conn = get_db()
+    conn.execute("UPDATE job_leases SET expires_at = 0")
+    conn.commit()
+    conn.close()
+    assert card_refresher.refresh_cards(max_calls=10)["cards_checked"] == 2
@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import card_search
+from card_search import CardSearchIndex, edit_distance, edit_distances, find_verified_match
+from database import get_db
+
+
+def card(card_id: str, name: str, issuer: str, status: str = "verified") -> dict:
+    return {"id": card_id, "card_name": name, "issuer": issuer, "network": "Visa", "verification_status": status}
+
+
+@pytest.fixture
+def index():
+    idx = CardSearchIndex()
+    for c in [
+        card("regalia", "HDFC Regalia", "HDFC"),
+        card("regalia-gold", "HDFC Regalia Gold", "HDFC"),
+        card("millennia", "HDFC Millennia", "HDFC"),
+        card("ace", "Axis Ace", "Axis"),
+        card("magnus", "Axis Magnus", "Axis", status="pending"),
+    ]:
+        idx.upsert(c)
+    return idx
+
+
+def test_edit_distance_matches_full_table():
+    rng = random.Random(3)
+    for _ in range(2000):
+        a = "".join(rng.choice("ab ") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("ab ") for _ in range(rng.randint(0, 8)))
+        assert edit_distance(a, b) == edit_distances(a, b)[0]
+
+
+def test_typo_resolves_to_intended_card(index):
+    score, summary = index.search("HDFC Millenia", limit=1, verification="verified", prefix=False)[0]
+    assert summary["id"] == "millennia"
+    assert score >= card_search.LOOKUP_MIN_SCORE
+
+
+def test_lookup_does_not_resolve_to_longer_name(index):
+    results = index.search("HDFC Regalia", limit=2, verification="verified", prefix=False)
+    assert results[0][1]["id"] == "regalia"
+    gold = index.search("HDFC Regalia Gld", limit=1, verification="verified", prefix=False)[0]
+    assert gold[1]["id"] == "regalia-gold"
+    index.remove("regalia")
+    best = index.search("HDFC Regalia", limit=1, verification="verified", prefix=False)
+    assert not best or best[0][0] < card_search.LOOKUP_MIN_SCORE
+
+
+def test_autocomplete_credits_prefixes(index):
+    ids = [s["id"] for _, s in index.search("hdfc rega", limit=5)]
+    assert set(ids[:2]) == {"regalia", "regalia-gold"}
+
+
+def test_verification_filter_and_remove(index):
+    assert all(s["id"] != "magnus" for _, s in index.search("Axis Magnus", verification="verified"))
+    assert index.search("Axis Magnus", verification="pending")[0][1]["id"] == "magnus"
+    index.remove("ace")
+    assert all(s["id"] != "ace" for _, s in index.search("Axis Ace"))
+
+
+def insert_card(card_id: str, name: str, updated_at: str) -> None:
+    conn = get_db()
+    conn.execute(
+        """
+        INSERT INTO card_catalog
+        (id, card_name, issuer, network, reward_rules_json, source, verification_status, evidence_json, created_by_user_id, created_at, updated_at)
+        VALUES (?, ?, 'Sync Bank', 'Visa', '{}', 'web_extracted', 'verified', NULL, NULL, ?, ?)
+        """,
+        (card_id, name, updated_at, updated_at),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_sync_picks_up_rows_committed_out_of_order(sqlite_db, monkeypatch):
+    monkeypatch.setattr(card_search, "_index", CardSearchIndex())
+    monkeypatch.setattr(card_search, "_synced_at", 0.0)
+    monkeypatch.setattr(card_search, "_synced_until", "")
+    monkeypatch.setattr(card_search, "CARD_SEARCH_SYNC_SECONDS", 0.0)
+    now = datetime.now(timezone.utc)
+
+    insert_card("newer", "Sync Newer", now.isoformat())
+    assert len(card_search.card_index()) == 4
+
+    # Stamped a minute earlier by another worker, committed after the sync above.
+    insert_card("older", "Sync Older", (now - timedelta(minutes=1)).isoformat())
+    assert card_search.card_index().search("Sync Bank Sync Older", limit=1)[0][1]["id"] == "older"
+
+
+def test_lookup_falls_back_to_index(client, auth_headers):
+    assert find_verified_match("HDFC Millenia", "HDFC")[0] == "seed-hdfc-millennia"
+    response = client.post("/api/cards/lookup", json={"card_name": "HDFC Millenia", "issuer": "HDFC"}, headers=auth_headers("u1"))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "found_verified"
+    assert body["card"]["card_name"] == "HDFC Millennia"
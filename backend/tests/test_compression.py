@@ -0,0 +1,121 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import compression
+from compression import CompressionMiddleware, choose_encoding
+
+BIG = json.dumps({"cards": [{"id": i, "name": f"Card {i}"} for i in range(200)]}).encode()
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("GZIP", "gzip"),
+        ("gzip;q=0", None),
+        ("gzip;q=abc", None),
+        ("gzip, br", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+        ("*", "br"),
+        ("*;q=0.5, br;q=0", "gzip"),
+    ],
+)
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip;q=0.1") == "gzip"
+
+
+def serve(body: bytes, headers: list[tuple[bytes, bytes]], accept: str | None = "gzip", chunks: int = 1) -> tuple[dict, bytes]:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        size = -(-len(body) // chunks)
+        for i in range(chunks):
+            await send({"type": "http.response.body", "body": body[i * size : (i + 1) * size], "more_body": i < chunks - 1})
+
+    start: dict = {}
+    sent: list[bytes] = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update({k.decode(): v.decode() for k, v in message["headers"]})
+        else:
+            sent.append(message["body"])
+
+    request_headers = [(b"accept-encoding", accept.encode())] if accept is not None else []
+    asyncio.run(CompressionMiddleware(app)({"type": "http", "headers": request_headers}, None, send))
+    return start, b"".join(sent)
+
+
+JSON = [(b"content-type", b"application/json"), (b"content-length", str(len(BIG)).encode())]
+
+
+def test_compresses_large_json():
+    headers, body = serve(BIG, JSON)
+    assert headers["content-encoding"] == "gzip"
+    assert headers["content-length"] == str(len(body))
+    assert headers["vary"] == "accept-encoding"
+    assert gzip.decompress(body) == BIG
+
+
+def test_small_body_left_alone_but_varies():
+    headers, body = serve(b'{"ok":true}', [(b"content-type", b"application/json")])
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "accept-encoding"
+    assert body == b'{"ok":true}'
+
+
+def test_vary_is_merged():
+    headers, _ = serve(BIG, JSON + [(b"vary", b"Origin")])
+    assert headers["vary"] == "accept-encoding, origin"
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        [(b"content-type", b"text/event-stream")],
+        [(b"content-type", b"application/json"), (b"content-encoding", b"br")],
+        [(b"content-type", b"image/png")],
+    ],
+)
+def test_passthrough(headers):
+    sent_headers, body = serve(BIG, headers)
+    assert sent_headers == {k.decode(): v.decode() for k, v in headers}
+    assert body == BIG
+
+
+def test_streamed_and_unaccepted_bodies_passthrough():
+    headers, body = serve(BIG, JSON, chunks=3)
+    assert "content-encoding" not in headers
+    assert body == BIG
+    headers, body = serve(BIG, JSON, accept=None)
+    assert headers == {"content-type": "application/json", "content-length": str(len(BIG))}
+    assert body == BIG
+
+
+def test_catalog_etag_differs_per_encoding(client):
+    tags = {}
+    for accept in ["br", "gzip", "identity"]:
+        response = client.get("/api/cards/public", headers={"Accept-Encoding": accept})
+        assert response.status_code == 200
+        tags[accept] = response.headers["etag"]
+    assert len(set(tags.values())) == 3
+    assert tags["br"].endswith('-br"') and tags["gzip"].endswith('-gzip"')
+
+    revalidate = client.get("/api/cards/public", headers={"Accept-Encoding": "gzip", "If-None-Match": tags["gzip"]})
+    assert revalidate.status_code == 304
+    assert revalidate.headers["etag"] == tags["gzip"]
+    other = client.get("/api/cards/public", headers={"Accept-Encoding": "br", "If-None-Match": tags["gzip"]})
+    assert other.status_code == 200
+    assert other.headers["content-encoding"] == "br"
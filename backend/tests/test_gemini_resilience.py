@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+import gemini_service
+from gemini_stub import Faults, make_server
+from resilience import CircuitBreaker, CircuitOpenError, RetryableError, call_with_retries
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = make_server(faults=Faults(seed=7))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("GEMINI_API_BASE", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setenv("GEMINI_API_KEY", "stub")
+    monkeypatch.setattr(gemini_service, "gemini_breaker", CircuitBreaker("gemini", failure_threshold=5, reset_timeout=0.5))
+    monkeypatch.setattr(gemini_service, "GEMINI_DEADLINE_SECONDS", 5.0)
+    yield server
+    server.shutdown()
+
+
+def call_many(count: int) -> tuple[int, int]:
+    ok = fast_fail = 0
+    for _ in range(count):
+        try:
+            gemini_service._call_gemini("hello")
+            ok += 1
+        except CircuitOpenError:
+            fast_fail += 1
+        except RetryableError:
+            pass
+    return ok, fast_fail
+
+
+def test_exhausted_call_counts_once_against_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=5)
+
+    def attempt(timeout: float) -> None:
+        raise RetryableError("boom")
+
+    with pytest.raises(RetryableError):
+        call_with_retries(attempt, breaker, deadline_seconds=10, max_attempts=3, base_delay=0)
+    assert breaker.snapshot()["consecutive_failures"] == 1
+    assert breaker.state == "closed"
+
+
+def test_retries_absorb_transient_errors(stub):
+    stub.faults.error_rate = 0.3
+    ok, fast_fail = call_many(100)
+    assert ok >= 95
+    assert fast_fail == 0
+    assert gemini_service.gemini_breaker.state == "closed"
+
+
+def test_outage_opens_breaker_and_recovers(stub):
+    stub.faults.error_rate = 1.0
+    ok, fast_fail = call_many(30)
+    assert ok == 0
+    assert fast_fail == 25
+    assert stub.stats["requests"] == 5 * gemini_service.GEMINI_MAX_ATTEMPTS
+
+    stub.faults.error_rate = 0.0
+    time.sleep(gemini_service.gemini_breaker.reset_timeout + 0.1)
+    ok, _ = call_many(5)
+    assert ok == 5
+    assert gemini_service.gemini_breaker.state == "closed"
@@ -0,0 +1,76 @@
+import asyncio
+import collections
+import time
+
+import pytest
+
+import profiling
+from database import get_db, now_ts
+from profiling import SlowRequestMiddleware, span
+
+
+@pytest.fixture
+def slow_buffer(monkeypatch):
+    buffer = collections.deque(maxlen=3)
+    monkeypatch.setattr(profiling, "_slow_requests", buffer)
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_MS", 50.0)
+    return buffer
+
+
+def serve(path: str, delay: float = 0.0, content_type: bytes = b"application/json", chunks: int = 1, chunk_delay: float = 0.0) -> None:
+    async def app(scope, receive, send):
+        with span("db"):
+            time.sleep(delay)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        for i in range(chunks):
+            if i:
+                time.sleep(chunk_delay)
+            await send({"type": "http.response.body", "body": b"x", "more_body": i < chunks - 1})
+
+    async def send(message):
+        pass
+
+    asyncio.run(SlowRequestMiddleware(app)({"type": "http", "method": "GET", "path": path}, None, send))
+
+
+def test_slow_request_captured_with_spans(slow_buffer):
+    serve("/fast")
+    serve("/slow", delay=0.08)
+
+    assert [e["path"] for e in slow_buffer] == ["/slow"]
+    entry = slow_buffer[0]
+    assert entry["status"] == 200
+    assert entry["spans"]["db"]["count"] == 1
+    assert entry["spans"]["db"]["ms"] >= 80
+    assert entry["duration_ms"] >= entry["spans"]["db"]["ms"]
+    assert entry["streamed"] is False
+
+
+def test_event_stream_timed_to_first_chunk(slow_buffer):
+    serve("/api/chat", content_type=b"text/event-stream", chunks=5, chunk_delay=0.03)
+    assert not slow_buffer
+
+    serve("/api/chat", delay=0.08, content_type=b"text/event-stream", chunks=5, chunk_delay=0.03)
+    assert slow_buffer[0]["streamed"] is True
+    assert slow_buffer[0]["duration_ms"] < 80 + 4 * 30
+
+
+def test_buffer_keeps_newest_entries(slow_buffer):
+    for i in range(5):
+        serve(f"/slow/{i}", delay=0.06)
+    assert [e["path"] for e in profiling.slow_requests()] == ["/slow/4", "/slow/3", "/slow/2"]
+    assert [e["path"] for e in profiling.slow_requests(path="/slow/3")] == ["/slow/3"]
+
+
+def test_admin_endpoints_require_admin_row(client, auth_headers, slow_buffer):
+    assert client.get("/api/admin/slow-requests").status_code == 401
+    assert client.get("/api/admin/slow-requests", headers=auth_headers("u1")).status_code == 403
+
+    conn = get_db()
+    conn.execute("INSERT INTO admin_users (user_id, granted_at) VALUES ('u1', ?)", (now_ts(),))
+    conn.commit()
+    conn.close()
+    response = client.get("/api/admin/slow-requests", headers=auth_headers("u1"))
+    assert response.status_code == 200
+    assert response.json() == {"requests": []}
+    assert client.get("/api/admin/slow-requests", headers=auth_headers("u2")).status_code == 403
@@ -0,0 +1,105 @@
+import pytest
+from starlette.requests import Request
+
+import rate_limit
+from rate_limit import DatabaseBucketStore, MemoryBucketStore, check_route_costs, client_ip
+
+
+def request(xff: str | None = None, peer: str = "10.0.0.1") -> Request:
+    headers = [(b"x-forwarded-for", xff.encode())] if xff is not None else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 12345)})
+
+
+def test_forwarded_for_ignored_without_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_PROXY_HOPS", 0)
+    assert client_ip(request("1.2.3.4")) == "10.0.0.1"
+
+
+@pytest.mark.parametrize(
+    "hops, xff, expected",
+    [
+        (1, "203.0.113.7", "203.0.113.7"),
+        (1, "6.6.6.6, 203.0.113.7", "203.0.113.7"),
+        (1, "6.6.6.6, 7.7.7.7, 203.0.113.7", "203.0.113.7"),
+        (2, "6.6.6.6, 203.0.113.7, 10.1.1.1", "203.0.113.7"),
+        (1, "", "10.0.0.1"),
+        (1, None, "10.0.0.1"),
+    ],
+)
+def test_client_supplied_forwarded_prefix_is_ignored(monkeypatch, hops, xff, expected):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_PROXY_HOPS", hops)
+    assert client_ip(request(xff)) == expected
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    monkeypatch.setattr(rate_limit.time, "time", clock)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_CAPACITY", 60.0)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_REFILL_PER_SEC", 1.0)
+    return clock
+
+
+@pytest.fixture(params=["memory", "db"])
+def store(request, clock):
+    if request.param == "db":
+        request.getfixturevalue("sqlite_db")
+        return DatabaseBucketStore()
+    return MemoryBucketStore()
+
+
+def test_bucket_empties_and_refills(store, clock):
+    for _ in range(3):
+        assert store.take(["user:a"], 20) == 0
+    assert store.take(["user:a"], 20) == pytest.approx(20)
+
+    clock.now += 10
+    assert store.take(["user:a"], 20) == pytest.approx(10)
+    clock.now += 10
+    assert store.take(["user:a"], 20) == 0
+
+    # Refill stops at capacity.
+    clock.now += 3600
+    for _ in range(3):
+        assert store.take(["user:a"], 20) == 0
+    assert store.take(["user:a"], 20) > 0
+
+
+def test_every_bucket_must_have_room(store, clock):
+    for _ in range(3):
+        assert store.take(["user:a", "ip:1"], 20) == 0
+    # A fresh user behind the same exhausted address is still limited, and is not charged.
+    assert store.take(["user:b", "ip:1"], 20) > 0
+    assert store.take(["user:b", "ip:2"], 60) == 0
+
+
+def test_route_cost_above_capacity_is_rejected():
+    check_route_costs({"analyze": 1, "lookup": 20}, 20)
+    with pytest.raises(RuntimeError, match="lookup"):
+        check_route_costs({"analyze": 1, "lookup": 20}, 10)
+
+
+def test_lookup_returns_429_with_retry_after(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_PROXY_HOPS", 1)
+    body = {"card_name": "HDFC Millennia", "issuer": "HDFC"}
+    for i in range(3):
+        # Different users and spoofed prefixes, one real client address.
+        headers = {**auth_headers(f"u{i}"), "X-Forwarded-For": f"198.51.100.{i}, 203.0.113.7"}
+        assert client.post("/api/cards/lookup", json=body, headers=headers).status_code == 200
+
+    headers = {**auth_headers("u9"), "X-Forwarded-For": "198.51.100.9, 203.0.113.7"}
+    response = client.post("/api/cards/lookup", json=body, headers=headers)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 20
+
+    headers = {**auth_headers("u9"), "X-Forwarded-For": "203.0.113.8"}
+    assert client.post("/api/cards/lookup", json=body, headers=headers).status_code == 200
@@ -0,0 +1,67 @@
+import pytest
+from pydantic import ValidationError
+
+from database import get_db, now_ts
+from schemas import AnalyzeReq
+from transactions import record_transaction, reward_summary
+from wallet_snapshot import materialize_wallet_snapshot
+
+
+def test_rollup_accumulates_per_month_and_category(sqlite_db):
+    conn = get_db()
+    record_transaction(conn, "u1", "Swiggy", "dining", 100.0, "c1", 5.0, 5.0, "2026-03-02T10:00:00+00:00")
+    record_transaction(conn, "u1", "Zomato", "dining", 200.0, "c2", 2.0, 10.0, "2026-03-20T10:00:00+00:00")
+    record_transaction(conn, "u1", "Amazon", "shopping", 50.0, "c1", 1.0, 1.0, "2026-03-21T10:00:00+00:00")
+    record_transaction(conn, "u1", "Swiggy", "dining", 999.0, "c1", 9.0, 9.0, "2026-04-01T00:00:00+00:00")
+    record_transaction(conn, "u2", "Swiggy", "dining", 999.0, "c1", 9.0, 9.0, "2026-03-05T00:00:00+00:00")
+    conn.commit()
+
+    summary = reward_summary(conn, "u1", "2026-03")
+    conn.close()
+    assert summary["totals"] == {"txn_count": 3, "amount": 350.0, "reward_earned": 8.0, "reward_best": 16.0, "reward_missed": 8.0}
+    dining = next(c for c in summary["categories"] if c["category"] == "dining")
+    assert dining == {"category": "dining", "txn_count": 2, "amount": 300.0, "reward_earned": 7.0, "reward_best": 15.0, "reward_missed": 8.0}
+
+
+def test_empty_month(sqlite_db):
+    conn = get_db()
+    summary = reward_summary(conn, "u1", "2026-01")
+    conn.close()
+    assert summary["categories"] == []
+    assert summary["totals"]["txn_count"] == 0
+
+
+@pytest.fixture
+def wallet(client):
+    conn = get_db()
+    conn.execute(
+        "INSERT INTO user_cards (id, user_id, card_catalog_id, nickname, last_four, is_active, created_at) VALUES ('uc', 'u1', 'seed-hdfc-millennia', NULL, NULL, 1, ?)",
+        (now_ts(),),
+    )
+    materialize_wallet_snapshot(conn, "u1")
+    conn.commit()
+    conn.close()
+    return client
+
+
+@pytest.mark.parametrize("amount", [0, -250, float("nan"), float("inf")])
+def test_amount_must_be_a_positive_number(amount):
+    with pytest.raises(ValidationError):
+        AnalyzeReq(merchant="Swiggy", amount=amount)
+
+
+@pytest.mark.parametrize("amount", [0, -250])
+def test_analyze_rejects_non_positive_amounts(wallet, auth_headers, amount):
+    response = wallet.post("/api/analyze", json={"merchant": "Swiggy", "amount": amount}, headers=auth_headers("u1"))
+    assert response.status_code == 422
+    summary = wallet.get("/api/analytics/rewards", headers=auth_headers("u1")).json()
+    assert summary["totals"]["txn_count"] == 0
+
+
+def test_analyze_records_into_rollup(wallet, auth_headers):
+    response = wallet.post("/api/analyze", json={"merchant": "Swiggy", "amount": 400}, headers=auth_headers("u1"))
+    assert response.status_code == 200
+    assert response.json()["category"] == "dining"
+    summary = wallet.get("/api/analytics/rewards", headers=auth_headers("u1")).json()
+    assert summary["totals"]["txn_count"] == 1
+    assert summary["totals"]["amount"] == 400.0
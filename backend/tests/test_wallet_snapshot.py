@@ -0,0 +1,82 @@
+import json
+import shutil
+
+import database
+from database import get_db, now_ts
+from wallet_snapshot import get_wallet_snapshot, materialize_wallet_snapshot
+
+
+def add_pending_card(user_id: str) -> None:
+    conn = get_db()
+    conn.execute(
+        """
+        INSERT INTO card_catalog
+        (id, card_name, issuer, network, reward_rules_json, source, verification_status, evidence_json, created_by_user_id, created_at, updated_at)
+        VALUES ('pending-1', 'Test Card', 'Test Bank', 'Visa', ?, 'web_extracted', 'pending', NULL, ?, ?, ?)
+        """,
+        (json.dumps({"dining": 0.05}), user_id, now_ts(), now_ts()),
+    )
+    conn.execute(
+        "INSERT INTO user_cards (id, user_id, card_catalog_id, nickname, last_four, is_active, created_at) VALUES ('uc-1', ?, 'pending-1', NULL, NULL, 1, ?)",
+        (user_id, now_ts()),
+    )
+    materialize_wallet_snapshot(conn, user_id)
+    conn.commit()
+    conn.close()
+
+
+def read_snapshot(user_id: str) -> tuple[int, dict]:
+    conn = get_db()
+    try:
+        return get_wallet_snapshot(conn, user_id)
+    finally:
+        conn.close()
+
+
+def test_unchanged_wallet_keeps_its_version(sqlite_db):
+    add_pending_card("u1")
+    assert read_snapshot("u1")[0] == read_snapshot("u1")[0] == 1
+
+
+def test_card_verified_out_of_band_rebuilds_snapshot(sqlite_db):
+    add_pending_card("u1")
+    version, snapshot = read_snapshot("u1")
+    assert snapshot["recommendations"]["dining"] is None
+
+    # Verified by hand, without touching updated_at.
+    conn = get_db()
+    conn.execute("UPDATE card_catalog SET verification_status = 'verified' WHERE id = 'pending-1'")
+    conn.commit()
+    conn.close()
+
+    new_version, snapshot = read_snapshot("u1")
+    assert new_version == version + 1
+    assert snapshot["recommendations"]["dining"]["card_id"] == "pending-1"
+    assert read_snapshot("u1")[0] == new_version
+
+
+def test_lagging_replica_defers_to_primary(sqlite_db, tmp_path, monkeypatch):
+    add_pending_card("u1")
+    replica_path = str(tmp_path / "replica.db")
+    shutil.copy(sqlite_db, replica_path)
+
+    conn = get_db()
+    conn.execute("UPDATE card_catalog SET verification_status = 'verified', updated_at = ? WHERE id = 'pending-1'", (now_ts(),))
+    conn.commit()
+    conn.close()
+    primary_version, _ = read_snapshot("u1")
+
+    # The replica has the old card and the old snapshot; it still matches, so it is served as is.
+    replica = database._connect(replica_path, role="replica")
+    assert get_wallet_snapshot(replica, "u1")[0] == primary_version - 1
+    replica.close()
+
+    # Once the card change arrives but the rebuilt snapshot has not, the primary's snapshot is used.
+    conn = database._connect(replica_path)
+    conn.execute("UPDATE card_catalog SET verification_status = 'verified' WHERE id = 'pending-1'")
+    conn.commit()
+    conn.close()
+    replica = database._connect(replica_path, role="replica")
+    assert get_wallet_snapshot(replica, "u1")[0] == primary_version
+    replica.close()
+    assert read_snapshot("u1")[0] == primary_version
@@ -0,0 +1,70 @@
+import uuid
+from typing import Any
+
+from database import CATEGORIES, DatabaseConnection, now_ts
+from queries import INSERT_TRANSACTION, REWARD_ROLLUPS, UPSERT_REWARD_ROLLUP
+
+
+def month_of(ts: str) -> str:
+    return ts[:7]
+
+
+def record_transaction(
+    conn: DatabaseConnection,
+    user_id: str,
+    merchant: str,
+    category: str,
+    amount: float,
+    card_id: str,
+    reward_earned: float,
+    reward_best: float,
+    created_at: str | None = None,
+) -> str:
+    """Insert one analyzed purchase and fold it into the monthly rollup. The caller commits."""
+    txn_id = str(uuid.uuid4())
+    created_at = created_at or now_ts()
+    month = month_of(created_at)
+    conn.run(
+        INSERT_TRANSACTION,
+        (txn_id, user_id, merchant, category, amount, card_id, reward_earned, reward_best, month, created_at),
+    )
+    conn.run(
+        UPSERT_REWARD_ROLLUP,
+        (user_id, month, category, amount, reward_earned, reward_best),
+    )
+    return txn_id
+
+
+def reward_summary(conn: DatabaseConnection, user_id: str, month: str) -> dict[str, Any]:
+    # Reads at most one rollup row per category, independent of history length.
+    rows = conn.run(REWARD_ROLLUPS, (user_id, month)).fetchall()
+    by_category = {r["category"]: r for r in rows}
+
+    categories = []
+    totals = {"txn_count": 0, "amount": 0.0, "reward_earned": 0.0, "reward_best": 0.0, "reward_missed": 0.0}
+    for category in CATEGORIES:
+        row = by_category.get(category)
+        if not row:
+            continue
+        earned = float(row["reward_earned"])
+        best = float(row["reward_best"])
+        entry = {
+            "category": category,
+            "txn_count": int(row["txn_count"]),
+            "amount": round(float(row["amount_total"]), 2),
+            "reward_earned": round(earned, 2),
+            "reward_best": round(best, 2),
+            "reward_missed": round(max(0.0, best - earned), 2),
+        }
+        categories.append(entry)
+        totals["txn_count"] += entry["txn_count"]
+        totals["amount"] += float(row["amount_total"])
+        totals["reward_earned"] += earned
+        totals["reward_best"] += best
+        totals["reward_missed"] += max(0.0, best - earned)
+
+    return {
+        "month": month,
+        "totals": {k: round(v, 2) if isinstance(v, float) else v for k, v in totals.items()},
+        "categories": categories,
+    }
@@ -0,0 +1,91 @@
+import json
+from typing import Any
+
+from database import CATEGORIES, DatabaseConnection, get_db, now_ts, row_to_card
+from queries import SNAPSHOT_BY_USER, UPSERT_SNAPSHOT, WALLET_CARDS, WALLET_SOURCE_VERSION
+
+
+def build_wallet_snapshot(conn: DatabaseConnection, user_id: str) -> dict[str, Any]:
+    rows = conn.run(WALLET_CARDS, (user_id,)).fetchall()
+    cards = [row_to_card(r) for r in rows]
+    verified = [c for c in cards if c["verification_status"] == "verified"]
+
+    recommendations: dict[str, dict[str, Any] | None] = {}
+    for category in CATEGORIES:
+        if not verified:
+            recommendations[category] = None
+            continue
+        best = max(verified, key=lambda x: x["reward_rules"].get(category, 0.0))
+        recommendations[category] = {
+            "card_id": best["id"],
+            "card_name": best["card_name"],
+            "issuer": best["issuer"],
+            "rate": best["reward_rules"].get(category, 0.0),
+        }
+
+    return {"cards": cards, "recommendations": recommendations}
+
+
+def wallet_source_version(conn: DatabaseConnection, user_id: str) -> str:
+    """What a snapshot was built from: the wallet's card count, verified count and newest card update."""
+    row = conn.run(WALLET_SOURCE_VERSION, (user_id,)).fetchone()
+    return f"{row['card_count']}:{row['verified_count'] or 0}:{row['last_updated'] or ''}"
+
+
+def materialize_wallet_snapshot(conn: DatabaseConnection, user_id: str) -> tuple[int, dict[str, Any]]:
+    """Rebuild the stored snapshot and bump its version. The caller commits."""
+    source_version = wallet_source_version(conn, user_id)
+    snapshot = build_wallet_snapshot(conn, user_id)
+    conn.run(UPSERT_SNAPSHOT, (user_id, json.dumps(snapshot), source_version, now_ts()))
+    row = conn.run(SNAPSHOT_BY_USER, (user_id,)).fetchone()
+    return int(row["version"]), snapshot
+
+
+def rematerialize_card_holders(conn: DatabaseConnection, card_ids: list[str]) -> list[str]:
+    """Rebuild snapshots of every wallet holding one of card_ids and return those users. The caller commits."""
+    if not card_ids:
+        return []
+    placeholders = ", ".join("?" for _ in card_ids)
+    rows = conn.execute(
+        f"SELECT DISTINCT user_id FROM user_cards WHERE is_active = 1 AND card_catalog_id IN ({placeholders})",
+        tuple(card_ids),
+    ).fetchall()
+    user_ids = [r["user_id"] for r in rows]
+    for user_id in user_ids:
+        materialize_wallet_snapshot(conn, user_id)
+    return user_ids
+
+
+def _current_snapshot(conn: DatabaseConnection, user_id: str) -> tuple[int, dict[str, Any]] | None:
+    row = conn.run(SNAPSHOT_BY_USER, (user_id,)).fetchone()
+    if row and row["source_version"] == wallet_source_version(conn, user_id):
+        return int(row["version"]), json.loads(row["payload_json"])
+    return None
+
+
+def get_wallet_snapshot(conn: DatabaseConnection, user_id: str) -> tuple[int, dict[str, Any]]:
+    """Stored snapshot, rebuilt on the primary when it is missing or its cards changed since it was built.
+
+    Cards also change outside the app (a card verified by editing the database), so every read
+    checks the wallet's cards against what the snapshot was built from.
+    """
+    current = _current_snapshot(conn, user_id)
+    if current:
+        return current
+
+    # A lagging replica may just not have the rebuilt snapshot yet; the primary decides.
+    primary = get_db() if conn.role == "replica" else conn
+    try:
+        current = _current_snapshot(primary, user_id)
+        if current:
+            return current
+        version, snapshot = materialize_wallet_snapshot(primary, user_id)
+        primary.commit()
+        return version, snapshot
+    finally:
+        if primary is not conn:
+            primary.close()
+
+
+def snapshot_etag(version: int) -> str:
+    return f'"wallet-v{version}"'